@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
-from flask_login import login_user, logout_user, login_required
-from models import User, db
+from functools import wraps
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, g
+from flask_login import login_user, logout_user, login_required, current_user
+from models import User, ApiToken, db
 
 # Utworzenie blueprintu dla funkcjonalności autoryzacji
 auth = Blueprint('auth', __name__)
@@ -28,7 +29,7 @@ def login():
 
         # Zalogowanie użytkownika
         login_user(user, remember=remember)
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     return render_template('login.html')
 
@@ -74,4 +75,32 @@ def register():
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('auth.login'))
\ No newline at end of file
+    return redirect(url_for('auth.login'))
+
+# Ścieżka do utworzenia tokenu API dla zalogowanego użytkownika
+@auth.route('/api-tokens', methods=['POST'])
+@login_required
+def create_api_token():
+    """
+    Tworzy nowy token API (nazwa w polu 'name') i zwraca go w formacie JSON.
+    Token jest widoczny tylko w tej odpowiedzi.
+    """
+    api_token, token = ApiToken.issue(current_user, request.form.get('name') or 'default')
+    db.session.add(api_token)
+    db.session.commit()
+    return jsonify({'name': api_token.name, 'token': token}), 201
+
+def token_required(view):
+    """
+    Dekorator ścieżek API: wymaga nagłówka "Authorization: Bearer <token>"
+    i ustawia g.api_user na właściciela tokenu. Bez poprawnego tokenu zwraca 401.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        user = ApiToken.find_user(token.strip()) if scheme.lower() == 'bearer' and token.strip() else None
+        if user is None:
+            return jsonify({'error': 'Brak lub nieprawidłowy token API'}), 401
+        g.api_user = user
+        return view(*args, **kwargs)
+    return wrapper
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Porównanie opóźnienia inferencji: skaler + predict_proba ze scikit-learn
+względem skompilowanego silnika NumPy (compiled_models.CompiledModels).
+Sprawdza też zgodność prawdopodobieństw obu ścieżek.
+
+Uruchomienie z katalogu ML_app:
+    python -m benchmarks.compiled_benchmark
+"""
+import argparse
+import warnings
+
+import numpy as np
+
+from benchmarks.inference_benchmark import DATASET_PATHS, load_artifacts, load_rows, measure, run_models
+from compiled_models import CompiledModels
+from inference import MODEL_NAMES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=200, help='liczba powtórzeń pomiaru')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    print(f"{'zbiór':<15}{'wiersze':>9}{'sklearn [ms]':>15}{'numpy [ms]':>13}{'przyspieszenie':>16}{'maks. różnica':>16}")
+    for dataset_name in DATASET_PATHS:
+        models = load_artifacts(dataset_name)
+        compiled = CompiledModels.from_estimators(models, models['scaler'])
+        rows = load_rows(dataset_name)
+
+        for input_data in (rows[:1], rows):
+            expected = run_models(models, models['scaler'].transform(input_data))
+            actual = compiled.predict_proba(input_data)
+            difference = max(np.abs(expected[key]['probability'] - actual[key]).max() for key in MODEL_NAMES)
+
+            before = measure(lambda: run_models(models, models['scaler'].transform(input_data)), args.repeats)
+            after = measure(lambda: compiled.predict_proba(input_data), args.repeats)
+            print(f"{dataset_name:<15}{len(input_data):>9}{before:>15.3f}{after:>13.3f}"
+                  f"{before / after:>15.1f}x{difference:>16.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Test obciążeniowy bazy SQLite przy współbieżnym zapisie i odczycie predykcji.
+
+Porównuje dwa profile połączeń na świeżych plikach bazy:
+  - default: create_engine bez dodatkowych opcji (poprzednia konfiguracja aplikacji,
+             dziennik rollback, synchronous=FULL)
+  - tuned:   opcje i ustawienia SQLite z modułu database (WAL, synchronous=NORMAL,
+             cache_size, mmap_size, busy_timeout, pula połączeń)
+
+N procesów (jak workery gunicorna) przez zadany czas wykonuje mieszankę operacji:
+zapis jednej predykcji z commitem (jak /predict) oraz odczyt strony historii (jak /history).
+Raportowana jest przepustowość, opóźnienia zapisu/odczytu i liczba błędów "database is locked".
+
+Uruchomienie z katalogu ML_app:
+    python -m benchmarks.db_load_test --workers 8 --duration 10
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+PROFILES = ('default', 'tuned')
+
+
+def create_engine_for(profile, url):
+    from sqlalchemy import create_engine
+    from database import engine_options, tune_engine
+
+    if profile == 'default':
+        return create_engine(url)
+    engine = create_engine(url, **engine_options(url))
+    tune_engine(engine)
+    return engine
+
+
+def make_record(rng, user_id):
+    from models import pack_features, pack_results
+
+    results = {model_key: {'prediction': rng.integers(0, 2, 1), 'probability': rng.random(1)}
+               for model_key in ('rf', 'lr', 'dt')}
+    probabilities, labels = pack_results(results)[0]
+    return {
+        'user_id': user_id,
+        'dataset': 'diabetes',
+        'features': pack_features(rng.random((1, 8)))[0],
+        'probabilities': probabilities,
+        'labels': labels
+    }
+
+
+def run_worker(profile, url, duration, write_ratio, seed, result_queue):
+    import datetime
+    from sqlalchemy import insert, select
+    from sqlalchemy.exc import OperationalError
+    from models import Prediction
+
+    engine = create_engine_for(profile, url)
+    rng = np.random.default_rng(seed)
+    stats = {'write': [], 'read': [], 'errors': 0}
+    user_id = seed % 10 + 1
+
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        operation = 'write' if rng.random() < write_ratio else 'read'
+        start = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                if operation == 'write':
+                    record = make_record(rng, user_id)
+                    record['timestamp'] = datetime.datetime.utcnow()
+                    connection.execute(insert(Prediction), [record])
+                else:
+                    connection.execute(
+                        select(Prediction.id, Prediction.timestamp, Prediction.features,
+                               Prediction.probabilities, Prediction.labels)
+                        .where(Prediction.user_id == user_id, Prediction.dataset == 'diabetes')
+                        .order_by(Prediction.timestamp.desc(), Prediction.id.desc())
+                        .limit(50)).all()
+        except OperationalError:
+            stats['errors'] += 1
+            continue
+        stats[operation].append((time.perf_counter() - start) * 1000)
+
+    engine.dispose()
+    result_queue.put(stats)
+
+
+def prepare_database(profile, url, rows):
+    """Tworzy tabele i wypełnia bazę początkowymi predykcjami (historia do odczytu)."""
+    from sqlalchemy import insert
+    from models import db, Prediction
+
+    engine = create_engine_for(profile, url)
+    db.metadata.create_all(engine)
+    rng = np.random.default_rng(0)
+    records = [make_record(rng, i % 10 + 1) for i in range(rows)]
+    with engine.begin() as connection:
+        connection.execute(insert(Prediction), records)
+    engine.dispose()
+
+
+def run_profile(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'load_test.db')}"
+        prepare_database(profile, url, args.rows)
+
+        context = multiprocessing.get_context('spawn')
+        result_queue = context.Queue()
+        workers = [context.Process(target=run_worker,
+                                   args=(profile, url, args.duration, args.write_ratio, seed, result_queue))
+                   for seed in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        results = [result_queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    writes = np.concatenate([r['write'] for r in results] + [[]])
+    reads = np.concatenate([r['read'] for r in results] + [[]])
+    return {
+        'ops': (len(writes) + len(reads)) / args.duration,
+        'writes': len(writes) / args.duration,
+        'write_p50': np.percentile(writes, 50) if len(writes) else float('nan'),
+        'write_p99': np.percentile(writes, 99) if len(writes) else float('nan'),
+        'read_p99': np.percentile(reads, 99) if len(reads) else float('nan'),
+        'errors': sum(r['errors'] for r in results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help='liczba współbieżnych procesów')
+    parser.add_argument('--duration', type=float, default=10.0, help='czas trwania testu na profil [s]')
+    parser.add_argument('--write-ratio', type=float, default=0.3, help='udział operacji zapisu')
+    parser.add_argument('--rows', type=int, default=10000, help='liczba predykcji w bazie przed testem')
+    parser.add_argument('--profile', choices=PROFILES, action='append', help='profil (domyślnie oba)')
+    args = parser.parse_args()
+
+    print(f"{'profil':<10}{'op/s':>10}{'zapisy/s':>10}{'zapis p50 [ms]':>16}{'zapis p99 [ms]':>16}"
+          f"{'odczyt p99 [ms]':>17}{'błędy':>8}")
+    for profile in args.profile or PROFILES:
+        s = run_profile(profile, args)
+        print(f"{profile:<10}{s['ops']:>10.0f}{s['writes']:>10.0f}{s['write_p50']:>16.2f}{s['write_p99']:>16.2f}"
+              f"{s['read_p99']:>17.2f}{s['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Porównanie czasu inferencji: osobne predict() + predict_proba() (poprzednie podejście)
+względem jednego predict_proba() na model (run_models).
+
+Uruchomienie z katalogu ML_app:
+    python -m benchmarks.inference_benchmark
+"""
+import argparse
+import time
+import warnings
+
+import pandas as pd
+
+from inference import MODEL_NAMES, apply_thresholds
+from model_loader import load_models
+from schema import DATASETS, ENCODERS
+
+DATASET_PATHS = {dataset_name: (config['path'], config['target']) for dataset_name, config in DATASETS.items()}
+
+
+def load_artifacts(dataset_name):
+    """Zwraca modele scikit-learn i skaler z artefaktów zapisanych przez MultiDatasetPredictor.save_models()."""
+    pipeline = load_models(dataset_name)
+    if pipeline.estimators is None:
+        raise ValueError(f"Artefakt {dataset_name} ({pipeline.compiled_precision}) nie zawiera modeli scikit-learn")
+    return {**pipeline.estimators, 'scaler': pipeline.scaler}
+
+
+def load_rows(dataset_name):
+    """Wczytuje cechy ze zbioru CSV w kolejności i kodowaniu ze schematu."""
+    path, _ = DATASET_PATHS[dataset_name]
+    return ENCODERS[dataset_name].encode_frame(pd.read_csv(path))
+
+
+def run_models(models, input_scaled, thresholds=None):
+    """
+    Uruchamia każdy model scikit-learn dokładnie raz (predict_proba) na przeskalowanej macierzy
+    i wyprowadza z tego samego wyniku zarówno etykietę, jak i prawdopodobieństwo.
+    Punkt odniesienia dla ścieżki produkcyjnej (inference.predict_input z ModelPipeline).
+    """
+    probabilities = {
+        model_key: models[model_key].predict_proba(input_scaled)[:, 1]
+        for model_key in MODEL_NAMES
+    }
+    return apply_thresholds(probabilities, thresholds)
+
+
+def predict_twice(models, input_scaled):
+    """Poprzednie podejście - każdy model jest uruchamiany dwukrotnie."""
+    for model_key in MODEL_NAMES:
+        models[model_key].predict(input_scaled)
+        models[model_key].predict_proba(input_scaled)
+
+
+def measure(func, repeats):
+    """Zwraca medianę czasu wykonania funkcji w milisekundach."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=50, help='liczba powtórzeń pomiaru')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    print(f"{'zbiór':<15}{'wiersze':>9}{'predict+proba [ms]':>21}{'proba [ms]':>13}{'oszczędność':>14}")
+    for dataset_name in DATASET_PATHS:
+        models = load_artifacts(dataset_name)
+        rows = models['scaler'].transform(load_rows(dataset_name))
+
+        for input_scaled in (rows[:1], rows):
+            before = measure(lambda: predict_twice(models, input_scaled), args.repeats)
+            after = measure(lambda: run_models(models, input_scaled), args.repeats)
+            saved = (1 - after / before) * 100
+            print(f"{dataset_name:<15}{len(input_scaled):>9}{before:>21.3f}{after:>13.3f}{saved:>13.1f}%")
+
+
+if __name__ == '__main__':
+    main()
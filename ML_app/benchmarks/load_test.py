@@ -0,0 +1,224 @@
+"""
+Test obciążeniowy całej aplikacji: logowanie -> /dataset -> /predict -> /history.
+
+Dla każdej konfiguracji serwera (workery x wątki) uruchamiany jest lokalny serwer na świeżej
+bazie SQLite (tabele tworzone przez flask init-db), a następnie N wirtualnych użytkowników (osobne procesy):
+  1. rejestruje konto przez auth.register i loguje się przez auth.login,
+  2. przez zadany czas powtarza przepływ: formularz /dataset/<zbiór>, predykcja /predict/<zbiór>
+     z wierszem wylosowanym z dołączonego pliku CSV, historia /history/<zbiór>.
+
+Raportowana jest przepustowość (żądania/s i predykcje/s) oraz opóźnienia p50/p90/p99
+dla każdej ścieżki. Serwer gunicorn (gunicorn.conf.py) lub - gdy gunicorn jest niedostępny
+albo wybrano --server werkzeug - wielowątkowy serwer deweloperski Flaska (tylko 1 worker).
+
+Uruchomienie z katalogu ML_app:
+    python -m benchmarks.load_test --config 1x4 --config 2x4 --clients 16 --duration 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --clients 8
+"""
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from schema import DATASETS
+
+ENDPOINTS = ('register', 'login', 'dataset', 'predict', 'history')
+STARTUP_TIMEOUT = 120.0
+
+
+def sample_rows(dataset_name, count, seed):
+    """Losuje wiersze cech z pliku CSV zbioru w postaci pól formularza (wartości jak w pliku)."""
+    config = DATASETS[dataset_name]
+    frame = pd.read_csv(config['path']).drop(columns=[config['target']])
+    frame.columns = frame.columns.str.strip()
+    return frame.sample(count, replace=True, random_state=seed).astype(str).to_dict('records')
+
+
+class Client:
+    """Sesja jednego wirtualnego użytkownika (ciasteczka logowania) z pomiarem czasu żądań."""
+
+    def __init__(self, base_url, timings, errors):
+        self.base_url = base_url
+        self.timings = timings
+        self.errors = errors
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, endpoint, path, form=None):
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        start = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + path, data=data, timeout=60) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            self.errors[endpoint] += 1
+            return False
+        self.timings[endpoint].append((time.perf_counter() - start) * 1000)
+        return True
+
+
+def run_client(base_url, index, duration, seed, result_queue):
+    timings = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = {endpoint: 0 for endpoint in ENDPOINTS}
+    client = Client(base_url, timings, errors)
+    rng = np.random.default_rng(seed)
+    dataset_names = list(DATASETS)
+    rows = {dataset_name: sample_rows(dataset_name, 200, seed) for dataset_name in dataset_names}
+
+    username = f'load-{seed}-{index}'
+    client.request('register', '/register', {'username': username, 'email': f'{username}@example.com',
+                                             'password': username})
+    logged_in = client.request('login', '/login', {'username': username, 'password': username})
+
+    predictions = 0
+    deadline = time.perf_counter() + duration
+    while logged_in and time.perf_counter() < deadline:
+        dataset_name = dataset_names[rng.integers(len(dataset_names))]
+        row = rows[dataset_name][rng.integers(len(rows[dataset_name]))]
+        client.request('dataset', f'/dataset/{dataset_name}')
+        if client.request('predict', f'/predict/{dataset_name}', row):
+            predictions += 1
+        client.request('history', f'/history/{dataset_name}')
+
+    result_queue.put({'timings': timings, 'errors': errors, 'predictions': predictions})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, workers, threads, port, database_url):
+    env = {
+        **os.environ,
+        'DATABASE_URL': database_url,
+        'MODEL_WATCH_INTERVAL': '0',
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': str(workers),
+        'GUNICORN_THREADS': str(threads)
+    }
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'flask-app', 'init-db'], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    if server == 'gunicorn':
+        command = ['gunicorn', '-c', 'gunicorn.conf.py']
+    else:
+        command = [sys.executable, '-c',
+                   "import importlib; importlib.import_module('flask-app').create_app().run("
+                   f"port={port}, threaded={threads > 1})"]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(base_url, process=None):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Serwer zakończył działanie (kod {process.returncode})")
+        try:
+            with urllib.request.urlopen(base_url + '/health/ready', timeout=5):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    raise RuntimeError(f"Serwer {base_url} nie jest gotowy po {STARTUP_TIMEOUT:.0f} s")
+
+
+def run_load(base_url, args, seed):
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    clients = [context.Process(target=run_client, args=(base_url, index, args.duration, seed + index, result_queue))
+               for index in range(args.clients)]
+    for client in clients:
+        client.start()
+    results = [result_queue.get() for _ in clients]
+    for client in clients:
+        client.join()
+
+    summary = {'predictions_per_s': sum(r['predictions'] for r in results) / args.duration, 'endpoints': {}}
+    for endpoint in ENDPOINTS:
+        timings = np.concatenate([r['timings'][endpoint] for r in results] + [[]])
+        summary['endpoints'][endpoint] = {
+            'requests': len(timings),
+            'requests_per_s': len(timings) / args.duration,
+            'p50_ms': float(np.percentile(timings, 50)) if len(timings) else None,
+            'p90_ms': float(np.percentile(timings, 90)) if len(timings) else None,
+            'p99_ms': float(np.percentile(timings, 99)) if len(timings) else None,
+            'errors': sum(r['errors'][endpoint] for r in results)
+        }
+    return summary
+
+
+def run_config(server, workers, threads, args):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        process = start_server(server, workers, threads, port, f"sqlite:///{os.path.join(tmp, 'load_test.db')}")
+        try:
+            wait_until_ready(base_url, process)
+            return run_load(base_url, args, seed=workers * 1000 + threads * 100)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def parse_config(value):
+    workers, _, threads = value.partition('x')
+    return int(workers), int(threads or 1)
+
+
+def print_summary(label, summary):
+    print(f"\n{label}: {summary['predictions_per_s']:.1f} predykcji/s")
+    print(f"{'ścieżka':<10}{'żądania':>9}{'żądania/s':>11}{'p50 [ms]':>10}{'p90 [ms]':>10}{'p99 [ms]':>10}{'błędy':>7}")
+    for endpoint, s in summary['endpoints'].items():
+        if not s['requests'] and not s['errors']:
+            continue
+        p50, p90, p99 = (s[key] if s[key] is not None else float('nan') for key in ('p50_ms', 'p90_ms', 'p99_ms'))
+        print(f"{endpoint:<10}{s['requests']:>9}{s['requests_per_s']:>11.1f}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}"
+              f"{s['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', type=parse_config, action='append',
+                        help='konfiguracja serwera WORKERYxWĄTKI, np. 2x4 (można podać wiele razy; domyślnie 1x1 i 1x4)')
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'),
+                        default='gunicorn' if shutil.which('gunicorn') else 'werkzeug', help='uruchamiany serwer')
+    parser.add_argument('--url', help='adres już działającego serwera (zamiast uruchamiania lokalnego)')
+    parser.add_argument('--clients', type=int, default=8, help='liczba współbieżnych wirtualnych użytkowników')
+    parser.add_argument('--duration', type=float, default=20.0, help='czas trwania testu na konfigurację [s]')
+    parser.add_argument('--output', help='plik JSON z wynikami')
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        base_url = args.url.rstrip('/')
+        wait_until_ready(base_url)
+        results[args.url] = run_load(base_url, args, seed=0)
+        print_summary(args.url, results[args.url])
+    else:
+        for workers, threads in args.config or [(1, 1), (1, 4)]:
+            if args.server == 'werkzeug' and workers > 1:
+                print(f"Pominięto {workers}x{threads}: serwer werkzeug obsługuje tylko 1 worker")
+                continue
+            label = f'{args.server} {workers}x{threads}'
+            results[label] = run_config(args.server, workers, threads, args)
+            print_summary(label, results[label])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'clients': args.clients, 'duration': args.duration, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
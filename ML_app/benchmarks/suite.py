@@ -0,0 +1,283 @@
+"""
+Zestaw benchmarków aplikacji z wynikami zapisywanymi do JSON (do porównywania przebiegów).
+
+Mierzy na dołączonych datasets/*.csv i models/*/:
+  - inference: czas inferencji każdego modelu (rf, lr, dt) i całego pipeline'u
+               dla jednego wiersza i całego zbioru (mediana, ms)
+  - model_load: czas wczytania artefaktu modeli z dysku (mediana, ms)
+  - db_insert: liczba zapisanych predykcji na sekundę - pojedyncze commity (jak tryb sync)
+               i partie (jak kolejka zapisu w tle)
+  - history: czas zapytania i renderowania strony historii (pierwsza strona i strona ze środka)
+             przy 10k, 100k i 1M predykcji użytkownika
+  - startup: czas startu aplikacji w świeżym procesie - import flask-app, create_app, pierwsze żądanie,
+             create_app z MODEL_PRELOAD=sync oraz polecenie `flask routes` (mediana, ms),
+             a także czy sam start zaimportował scikit-learn (0 lub 1)
+
+Wszystkie wyniki trafiają do płaskiego słownika 'metrics' (np. "inference.diabetes.rf.row_ms"),
+a --compare wypisuje zmianę względem wcześniejszego pliku JSON.
+
+Uruchomienie z katalogu ML_app:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --history-sizes 10000 --output wyniki.json --compare poprzednie.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import sklearn
+
+from benchmarks.inference_benchmark import DATASET_PATHS, load_rows, measure
+from inference import MODEL_NAMES
+
+RESULTS_DIR = 'benchmarks/results'
+
+# Pomiar startu aplikacji w osobnym interpreterze (wynik jako JSON na stdout)
+STARTUP_SCRIPT = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+flask_app = importlib.import_module('flask-app')
+imported = time.perf_counter()
+app = flask_app.create_app()
+created = time.perf_counter()
+app.test_client().get('/health/live')
+print(json.dumps({'import_ms': (imported - start) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (time.perf_counter() - created) * 1000,
+                  'sklearn_imported': int('sklearn' in sys.modules)}))
+'''
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def bench_inference(metrics, repeats):
+    from model_loader import load_models
+
+    for dataset_name in DATASET_PATHS:
+        pipeline = load_models(dataset_name)
+        rows = load_rows(dataset_name)
+        for label, input_data in (('row', rows[:1]), ('batch', rows)):
+            input_scaled = pipeline.scaler.transform(input_data)
+            for model_key in MODEL_NAMES:
+                # Artefakty float32/uint8 zawierają tylko skompilowane tablice, bez modeli scikit-learn
+                if pipeline.estimators is not None:
+                    metrics[f'inference.{dataset_name}.{model_key}.{label}_ms'] = measure(
+                        lambda: pipeline.estimators[model_key].predict_proba(input_scaled), repeats)
+                metrics[f'inference.{dataset_name}.{model_key}.compiled_{label}_ms'] = measure(
+                    lambda: pipeline.compiled.predict_model(model_key, input_data), repeats)
+            metrics[f'inference.{dataset_name}.pipeline.{label}_ms'] = measure(
+                lambda: pipeline.predict_proba(input_data), repeats)
+        metrics[f'inference.{dataset_name}.batch_rows'] = len(rows)
+
+
+def bench_model_load(metrics, repeats):
+    from model_loader import read_pipeline
+
+    for dataset_name in DATASET_PATHS:
+        metrics[f'model_load.{dataset_name}_ms'] = measure(lambda: read_pipeline(dataset_name), repeats)
+
+
+def make_records(count, dataset_name, user_id, rng, start_time):
+    """Buduje rekordy tabeli prediction z losowymi cechami i wynikami (znaczniki czasu rosnące co 1 s)."""
+    from models import pack_features, pack_results
+    from schema import feature_names
+
+    features = rng.random((count, len(feature_names(dataset_name)))) * 100
+    results = {model_key: {'prediction': rng.integers(0, 2, count), 'probability': rng.random(count)}
+               for model_key in ('rf', 'lr', 'dt')}
+    return [
+        {'user_id': user_id, 'dataset': dataset_name, 'timestamp': start_time + timedelta(seconds=i),
+         'features': packed, 'probabilities': probabilities, 'labels': labels}
+        for i, (packed, (probabilities, labels)) in enumerate(zip(pack_features(features), pack_results(results)))
+    ]
+
+
+def bench_db_insert(metrics, single_rows, batch_rows):
+    from sqlalchemy import create_engine, insert
+    from database import engine_options, tune_engine
+    from models import db, Prediction
+
+    rng = np.random.default_rng(0)
+    start_time = datetime(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'insert.db')}"
+        engine = create_engine(url, **engine_options(url))
+        tune_engine(engine)
+        db.metadata.create_all(engine)
+
+        records = make_records(single_rows, 'diabetes', 1, rng, start_time)
+        start = time.perf_counter()
+        for record in records:
+            with engine.begin() as connection:
+                connection.execute(insert(Prediction), [record])
+        metrics['db_insert.single_commit_rows_per_s'] = single_rows / (time.perf_counter() - start)
+
+        records = make_records(batch_rows, 'diabetes', 1, rng, start_time)
+        start = time.perf_counter()
+        for offset in range(0, batch_rows, 1000):
+            with engine.begin() as connection:
+                connection.execute(insert(Prediction), records[offset:offset + 1000])
+        metrics['db_insert.batch_1000_rows_per_s'] = batch_rows / (time.perf_counter() - start)
+        engine.dispose()
+
+
+def bench_startup(metrics, repeats):
+    """
+    Uruchamia aplikację w świeżych procesach (zimny start interpretera) i zapisuje medianę czasów
+    importu, create_app i pierwszego żądania, create_app z synchronicznym ładowaniem modeli
+    oraz czasu całego polecenia `flask routes`.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, 'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+               'MODEL_PRELOAD': 'off', 'MODEL_WATCH_INTERVAL': '0'}
+
+        def run_script(extra_env=None):
+            result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], env={**env, **(extra_env or {})},
+                                    capture_output=True, text=True, check=True)
+            return json.loads(result.stdout.strip().splitlines()[-1])
+
+        runs = [run_script() for _ in range(repeats)]
+        for name in ('import_ms', 'create_app_ms', 'first_request_ms'):
+            metrics[f'startup.{name}'] = float(np.median([run[name] for run in runs]))
+        metrics['startup.sklearn_imported'] = max(run['sklearn_imported'] for run in runs)
+        metrics['startup.create_app_sync_preload_ms'] = float(np.median(
+            [run_script({'MODEL_PRELOAD': 'sync'})['create_app_ms'] for _ in range(max(1, repeats // 2))]))
+
+        def flask_routes():
+            subprocess.run([sys.executable, '-m', 'flask', '--app', 'flask-app', 'routes'], env=env,
+                           capture_output=True, check=True)
+
+        metrics['startup.cli_routes_ms'] = measure(flask_routes, repeats)
+    print(f"  import {metrics['startup.import_ms']:.0f} ms, create_app {metrics['startup.create_app_ms']:.0f} ms, "
+          f"flask routes {metrics['startup.cli_routes_ms']:.0f} ms, scikit-learn przy starcie: "
+          f"{'tak' if metrics['startup.sklearn_imported'] else 'nie'}")
+
+
+def bench_history(metrics, sizes, repeats):
+    """
+    Wypełnia tymczasową bazę predykcjami jednego użytkownika i mierzy żądania /history
+    przez klienta testowego aplikacji (zapytanie + renderowanie szablonu).
+    """
+    from sqlalchemy import insert
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flask_app = importlib.import_module('flask-app')
+        from models import db, init_db, Prediction, User
+
+        app = flask_app.create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'history.db')}",
+            'MODEL_PRELOAD': 'off',
+            'MODEL_WATCH_INTERVAL': 0,
+            'PREDICTION_WRITE_MODE': 'sync',
+            'METRICS_MODE': 'off'
+        })
+        with app.app_context():
+            init_db()
+
+        client = app.test_client()
+        client.post('/register', data={'username': 'benchmark', 'email': 'benchmark@example.com', 'password': 'x'})
+        client.post('/login', data={'username': 'benchmark', 'password': 'x'})
+
+        with app.app_context():
+            user_id = db.session.execute(db.select(User.id).filter_by(username='benchmark')).scalar_one()
+
+        rng = np.random.default_rng(0)
+        start_time = datetime(2025, 1, 1)
+        inserted = 0
+        for size in sorted(sizes):
+            with app.app_context():
+                while inserted < size:
+                    records = make_records(min(50000, size - inserted), 'diabetes', user_id, rng, start_time)
+                    db.session.execute(insert(Prediction), records)
+                    db.session.commit()
+                    start_time = records[-1]['timestamp'] + timedelta(seconds=1)
+                    inserted += len(records)
+                middle = db.session.execute(
+                    db.select(Prediction).filter_by(user_id=user_id).order_by(Prediction.id)
+                    .offset(size // 2).limit(1)).scalar_one()
+                cursor = flask_app.encode_cursor(middle)
+
+            def first_page():
+                response = client.get('/history/diabetes')
+                assert response.status_code == 200
+
+            def middle_page():
+                response = client.get(f'/history/diabetes?before={cursor}')
+                assert response.status_code == 200
+
+            metrics[f'history.{size}.first_page_ms'] = measure(first_page, repeats)
+            metrics[f'history.{size}.middle_page_ms'] = measure(middle_page, repeats)
+            print(f"  historia {size:>8} wierszy: pierwsza strona {metrics[f'history.{size}.first_page_ms']:.2f} ms, "
+                  f"środek {metrics[f'history.{size}.middle_page_ms']:.2f} ms")
+
+
+def compare(metrics, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['metrics']
+    print(f"\n{'metryka':<50}{'poprzednio':>14}{'teraz':>14}{'zmiana':>10}")
+    for name, value in metrics.items():
+        if name in baseline and baseline[name]:
+            print(f"{name:<50}{baseline[name]:>14.3f}{value:>14.3f}{(value / baseline[name] - 1) * 100:>9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=50, help='liczba powtórzeń pomiarów czasu')
+    parser.add_argument('--history-sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='liczby predykcji w bazie dla pomiaru historii')
+    parser.add_argument('--insert-rows', type=int, default=100000, help='liczba predykcji zapisywanych w partiach')
+    parser.add_argument('--output', help=f'plik wyników JSON (domyślnie {RESULTS_DIR}/suite-<czas>.json)')
+    parser.add_argument('--compare', help='plik JSON z poprzedniego przebiegu do porównania')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    metrics = {}
+
+    print("Start aplikacji...")
+    bench_startup(metrics, max(3, args.repeats // 10))
+    print("Inferencja...")
+    bench_inference(metrics, args.repeats)
+    print("Ładowanie modeli...")
+    bench_model_load(metrics, max(5, args.repeats // 10))
+    print("Zapis do bazy danych...")
+    bench_db_insert(metrics, single_rows=1000, batch_rows=args.insert_rows)
+    print("Historia predykcji...")
+    bench_history(metrics, args.history_sizes, max(5, args.repeats // 5))
+
+    started = datetime.now(timezone.utc)
+    output = args.output or f"{RESULTS_DIR}/suite-{started.strftime('%Y%m%d%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'created': started.isoformat(),
+                'git_commit': git_commit(),
+                'python': sys.version.split()[0],
+                'numpy': np.__version__,
+                'sklearn': sklearn.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'repeats': args.repeats
+            },
+            'metrics': metrics
+        }, f, indent=2, sort_keys=True)
+    print(f"Zapisano wyniki do {output}")
+
+    if args.compare:
+        compare(metrics, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Pomiar pamięci zajmowanej przez modele w każdym workerze (tylko Linux).
+
+Porównuje trzy strategie ładowania modeli przez N procesów potomnych:
+  - per-worker:   każdy worker ładuje modele samodzielnie (poprzednie zachowanie)
+  - mmap:         każdy worker ładuje modele z mmap_mode='r'
+  - preload-fork: modele ładowane raz w procesie nadrzędnym przed fork (gunicorn preload_app)
+
+Dla każdego workera raportowany jest przyrost RSS oraz PSS (Proportional Set Size,
+czyli RSS z podziałem stron współdzielonych przez liczbę procesów, które je mapują).
+
+Uruchomienie z katalogu ML_app:
+    python -m benchmarks.worker_memory --workers 4
+"""
+import argparse
+import multiprocessing
+import warnings
+
+DATASETS = ('heart_disease', 'diabetes', 'lung_cancer')
+
+
+def read_memory_kb(pid='self'):
+    """Zwraca (RSS, PSS) procesu w kB na podstawie /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0]] = int(parts[1])
+    return values['Rss:'], values['Pss:']
+
+
+def load_all(mmap_mode):
+    import model_loader
+    model_loader.MODEL_MMAP_MODE = mmap_mode
+    for dataset_name in DATASETS:
+        model_loader.load_models(dataset_name)
+        model_loader.warm_up(dataset_name)
+
+
+def worker(strategy, start_event, ready_queue, stop_event):
+    warnings.filterwarnings('ignore')
+    start_event.wait()
+    before = read_memory_kb()
+    if strategy != 'preload-fork':
+        load_all('r' if strategy == 'mmap' else 'none')
+    else:
+        # Modele odziedziczone po fork - predykcja dotyka stron tak jak obsługa żądania
+        import model_loader
+        for dataset_name in DATASETS:
+            model_loader.warm_up(dataset_name)
+    ready_queue.put((before, read_memory_kb()))
+    stop_event.wait()
+
+
+def measure(strategy, workers):
+    context = multiprocessing.get_context('fork')
+    if strategy == 'preload-fork':
+        load_all('r')
+
+    start_event, stop_event = context.Event(), context.Event()
+    ready_queue = context.Queue()
+    processes = [context.Process(target=worker, args=(strategy, start_event, ready_queue, stop_event))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    start_event.set()
+    results = [ready_queue.get() for _ in processes]
+
+    # PSS odczytywany, gdy wszystkie workery wciąż żyją i współdzielą strony
+    pss_total = sum(read_memory_kb(process.pid)[1] for process in processes)
+    stop_event.set()
+    for process in processes:
+        process.join()
+
+    rss_delta = sum(after[0] - before[0] for before, after in results) / workers
+    return rss_delta, pss_total / workers
+
+
+def run_strategy(strategy, workers, result_queue):
+    warnings.filterwarnings('ignore')
+    result_queue.put(measure(strategy, workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='liczba procesów workerów')
+    parser.add_argument('--strategy', choices=('per-worker', 'mmap', 'preload-fork'), action='append',
+                        help='strategia do zmierzenia (domyślnie wszystkie)')
+    args = parser.parse_args()
+
+    print(f"{'strategia':<15}{'przyrost RSS/worker [MB]':>26}{'PSS/worker [MB]':>18}")
+    for strategy in args.strategy or ('per-worker', 'mmap', 'preload-fork'):
+        # Każda strategia w świeżym procesie, aby modele z poprzedniego pomiaru nie zaburzały wyniku
+        context = multiprocessing.get_context('spawn')
+        result_queue = context.Queue()
+        process = context.Process(target=run_strategy, args=(strategy, args.workers, result_queue))
+        process.start()
+        rss_delta, pss = result_queue.get()
+        process.join()
+        print(f"{strategy:<15}{rss_delta / 1024:>26.2f}{pss / 1024:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Ocena dużych plików CSV (w formacie datasets/*.csv) zapisanymi modelami z models/<zbiór>/.
+
+Plik wejściowy jest czytany porcjami po --chunk-size wierszy, porcje są oceniane równolegle
+w puli procesów (każdy proces ładuje modele raz), a wyniki są dopisywane do pliku wyjściowego
+w kolejności wierszy wejścia. W pamięci jest naraz najwyżej kilka porcji na proces,
+niezależnie od rozmiaru pliku.
+
+Kodowanie cech kategorycznych (np. GENDER w lung_cancer) i kolejność kolumn pochodzą
+ze wspólnego schematu (schema.py), tego samego, którego używa MultiDatasetPredictor.
+
+Uruchomienie z katalogu ML_app:
+    python bulk_score.py diabetes eksport.csv wyniki.csv
+    python bulk_score.py lung_cancer eksport.csv wyniki.parquet --chunk-size 100000 --processes 4
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from inference import DEFAULT_THRESHOLDS, predict_input
+from schema import DATASETS, ENCODERS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Domyślna liczba wierszy w jednej porcji
+CHUNK_SIZE = 50000
+
+# Modele załadowane w procesie roboczym (ustawiane przez init_worker)
+_pipeline = None
+
+
+def init_worker(dataset_name):
+    global _pipeline
+    from model_loader import load_models
+    _pipeline = load_models(dataset_name)
+
+
+def score_chunk(dataset_name, chunk, thresholds, keep_columns):
+    """
+    Koduje porcję wierszy według schematu i ocenia ją wszystkimi modelami.
+    Zwraca DataFrame z kolumnami <model>_probability i <model>_prediction
+    (poprzedzonymi kolumnami wejścia, gdy keep_columns).
+    """
+    results = predict_input(_pipeline, ENCODERS[dataset_name].encode_frame(chunk), thresholds)
+    scored = chunk.reset_index(drop=True) if keep_columns else pd.DataFrame(index=range(len(chunk)))
+    for model_key, result in results.items():
+        scored[f'{model_key}_probability'] = result['probability']
+        scored[f'{model_key}_prediction'] = result['prediction']
+    return scored
+
+
+class CsvOutput:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            open(self.path, 'w').close()
+
+
+class ParquetOutput:
+    """Zapis kolejnych porcji jako grup wierszy jednego pliku Parquet (wymaga pyarrow)."""
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise RuntimeError("Zapis do formatu Parquet wymaga pakietu pyarrow (pip install pyarrow)")
+        self.path = path
+        self.writer = None
+
+    def write(self, frame):
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_output(path, output_format=None):
+    output_format = output_format or ('parquet' if path.endswith(('.parquet', '.pq')) else 'csv')
+    return ParquetOutput(path) if output_format == 'parquet' else CsvOutput(path)
+
+
+def score_file(dataset_name, input_path, output, chunk_size=CHUNK_SIZE, processes=None,
+               thresholds=None, keep_columns=True):
+    """
+    Ocenia plik CSV porcjami w puli procesów i zapisuje wyniki do output w kolejności wejścia.
+    Liczba porcji w toku jest ograniczona (2 na proces), więc zużycie pamięci nie zależy od rozmiaru pliku.
+    Zwraca liczbę ocenionych wierszy.
+    """
+    processes = processes or os.cpu_count() or 1
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    pending = deque()
+    rows = 0
+
+    def write_next():
+        nonlocal rows
+        first_row, last_row, future = pending.popleft()
+        try:
+            scored = future.result()
+        except ValueError as e:
+            raise ValueError(f"Błąd w wierszach {first_row + 1}-{last_row}: {e}") from None
+        output.write(scored)
+        rows += len(scored)
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(dataset_name,)) as pool:
+        first_row = 0
+        for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+            chunk.columns = chunk.columns.str.strip()
+            future = pool.submit(score_chunk, dataset_name, chunk, thresholds, keep_columns)
+            pending.append((first_row, first_row + len(chunk), future))
+            first_row += len(chunk)
+            if len(pending) >= 2 * processes:
+                write_next()
+        while pending:
+            write_next()
+
+    output.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dataset', choices=list(DATASETS), help='zbiór danych (zestaw modeli i schemat cech)')
+    parser.add_argument('input', help='plik CSV z kolumnami cech zbioru danych')
+    parser.add_argument('output', help='plik wynikowy (.csv lub .parquet)')
+    parser.add_argument('--format', choices=('csv', 'parquet'), help='format wyjścia (domyślnie wg rozszerzenia)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='liczba wierszy w porcji')
+    parser.add_argument('--processes', type=int, help='liczba procesów oceniających (domyślnie liczba rdzeni)')
+    parser.add_argument('--scores-only', action='store_true', help='zapisz tylko wyniki modeli, bez kolumn wejścia')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        output = open_output(args.output, args.format)
+        rows = score_file(args.dataset, args.input, output, args.chunk_size, args.processes,
+                          keep_columns=not args.scores_only)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Błąd: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"Oceniono {rows} wierszy w {elapsed:.2f} s ({rows / elapsed:.0f} wierszy/s) -> {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
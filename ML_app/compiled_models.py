@@ -0,0 +1,238 @@
+import numpy as np
+
+# Wersja formatu skompilowanych tablic - zwiększana przy każdej niezgodnej zmianie układu
+COMPILED_FORMAT_VERSION = 2
+
+# Dokładność przechowywania tablic drzew (rf, dt) w skompilowanym artefakcie
+# (ModelPipeline przy float32 i uint8 nie zapisuje już modeli scikit-learn, tylko te tablice):
+#   float64 - bez strat (domyślnie)
+#   float32 - progi i wartości liści float32, indeksy w najmniejszym wystarczającym typie całkowitym;
+#             progi nie są przenoszone do surowej przestrzeni cech (próg float32 nie oddzieliłby dokładnie
+#             wartości z danych, np. 0.366 czy 57, leżących tuż przy progu), tylko porównywane - jak w scikit-learn -
+#             ze standaryzowanymi cechami float32, więc decyzje w węzłach są identyczne jak w scikit-learn
+#   uint8   - jak float32, a wartości liści kwantyzowane do 256 poziomów (błąd prawdopodobieństwa < 1/255;
+#             wartości <= 0.5 zaokrąglane w dół, a > 0.5 w górę, więc etykieta liścia przy progu 0.5 się nie zmienia)
+TREE_PRECISIONS = ('float64', 'float32', 'uint8')
+
+
+def fold_thresholds(threshold, mean, scale):
+    """
+    Przenosi progi podziału ze standaryzowanej przestrzeni cech do surowej.
+    scikit-learn porównuje float32((x - mean) / scale) <= t, a progi bywają równe
+    zaokrąglonym wartościom z danych, więc samo t * scale + mean może odwrócić decyzję
+    na granicy. Dlatego bisekcją wyznaczany jest największy surowy próg r (float64), dla którego
+    float32((r - mean) / scale) <= t - wtedy x <= r daje dokładnie tę samą decyzję co scikit-learn.
+    """
+    def transformed(value):
+        return ((value - mean) / scale).astype(np.float32)
+
+    estimate = threshold * scale + mean
+    margin = (np.abs(threshold) + 1.0) * scale * 1e-5
+    low, high = estimate - margin, estimate + margin
+    for _ in range(80):
+        middle = low + (high - low) / 2
+        below = transformed(middle) <= threshold
+        low = np.where(below, middle, low)
+        high = np.where(below, high, middle)
+    return low
+
+
+def compile_trees(estimators, mean, scale, fold=True):
+    """
+    Spłaszcza drzewa decyzyjne do wspólnych, zwartych tablic NumPy.
+    Liście wskazują same na siebie (left = right = własny indeks), dzięki czemu
+    przejście wszystkich drzew wykonuje stałą liczbę kroków bez rozgałęzień w Pythonie.
+    Standaryzacja jest wliczona w progi podziału (scale > 0, więc kierunek nierówności się nie zmienia):
+        (x - mean) / scale <= t  <=>  x <= t * scale + mean  (z dokładnością wyznaczoną w fold_thresholds)
+    Przy fold=False progi pozostają w przestrzeni standaryzowanej, a mean i scale są zapisywane
+    w tablicach drzew (apply_trees standaryzuje wtedy wejście jak scikit-learn).
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        feature = np.where(is_leaf, 0, tree.feature)
+        features.append(feature)
+        threshold = fold_thresholds(tree.threshold, mean[feature], scale[feature]) if fold else tree.threshold
+        thresholds.append(np.where(is_leaf, 0.0, threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+        # Prawdopodobieństwo klasy pozytywnej w liściu (wartości normalizowane jak w predict_proba)
+        counts = tree.value[:, 0, :]
+        values.append(counts[:, 1] / counts.sum(axis=1))
+
+        roots.append(offset)
+        offset += tree.node_count
+        depth = max(depth, tree.max_depth)
+
+    trees = {
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'depth': np.asarray(depth, dtype=np.int32)
+    }
+    if not fold:
+        trees.update(mean=np.asarray(mean, dtype=np.float64), scale=np.asarray(scale, dtype=np.float64))
+    return trees
+
+
+def index_dtype(max_value):
+    """Najmniejszy typ całkowity bez znaku mieszczący indeksy 0..max_value."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def round_down_float32(values):
+    """
+    Największe wartości float32 nie większe od values (float64). Dla wejścia float32 warunek
+    x <= float64_próg jest wtedy równoważny x <= float32_próg (zwykłe rzutowanie zaokrągla do najbliższej
+    wartości i mogłoby przesunąć próg ponad wartość cechy, odwracając decyzję).
+    """
+    rounded = values.astype(np.float32)
+    return np.where(rounded > values, np.nextafter(rounded, np.float32(-np.inf)), rounded)
+
+
+def quantize_leaf_values(values, levels=255):
+    """
+    Kwantyzuje prawdopodobieństwa liści do liczb całkowitych 0..levels tak, aby wartości <= 0.5
+    pozostały <= 0.5 (zaokrąglenie w dół), a wartości > 0.5 pozostały > 0.5 (w górę).
+    """
+    scaled = values * levels
+    return np.where(values <= 0.5, np.floor(scaled), np.ceil(scaled)).astype(np.uint8)
+
+
+def quantize_trees(trees, precision):
+    """
+    Zwraca tablice drzew zapisane z mniejszą dokładnością (TREE_PRECISIONS).
+    Dla float32 i uint8 progi muszą być w przestrzeni standaryzowanej (compile_trees z fold=False).
+    """
+    if precision not in TREE_PRECISIONS:
+        raise ValueError(f"Nieznana dokładność drzew: {precision}")
+    if precision == 'float64':
+        return trees
+    if 'mean' not in trees:
+        raise ValueError("Kwantyzacja wymaga progów w przestrzeni standaryzowanej (compile_trees z fold=False)")
+
+    trees = dict(trees)
+    node_dtype = index_dtype(len(trees['left']) - 1)
+    trees.update(
+        feature=trees['feature'].astype(index_dtype(int(trees['feature'].max(initial=0)))),
+        threshold=round_down_float32(trees['threshold']),
+        left=trees['left'].astype(node_dtype),
+        right=trees['right'].astype(node_dtype),
+        roots=trees['roots'].astype(node_dtype)
+    )
+    if precision == 'uint8':
+        trees['value'] = quantize_leaf_values(trees['value'])
+        trees['value_scale'] = np.asarray(1 / 255, dtype=np.float64)
+    else:
+        trees['value'] = trees['value'].astype(np.float32)
+    return trees
+
+
+def compile_models(models, scaler, precision='float64'):
+    """
+    Eksportuje wytrenowane modele (rf, lr, dt) wraz ze skalerem do słownika samych tablic NumPy,
+    działających bezpośrednio na surowych cechach. Dla regresji logistycznej standaryzacja
+    jest wliczona w wagi:
+        ((x - mean) / scale) @ w + b  ==  x @ (w / scale) + (b - (mean / scale) @ w)
+    a dla drzew w progi podziału (compile_trees).
+    Słownik zapisany przez joblib bez kompresji może być ładowany z mmap_mode='r'.
+    precision określa dokładność przechowywania tablic drzew (TREE_PRECISIONS).
+    """
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    coef = np.asarray(models['lr'].coef_[0], dtype=np.float64)
+    fold = precision == 'float64'
+
+    return {
+        'format_version': np.asarray(COMPILED_FORMAT_VERSION, dtype=np.int32),
+        'n_features': np.asarray(len(mean), dtype=np.int32),
+        'rf': quantize_trees(compile_trees(models['rf'].estimators_, mean, scale, fold), precision),
+        'dt': quantize_trees(compile_trees([models['dt']], mean, scale, fold), precision),
+        'lr': {
+            'coef': coef / scale,
+            'intercept': np.asarray(models['lr'].intercept_[0] - (mean / scale) @ coef, dtype=np.float64)
+        }
+    }
+
+
+def apply_trees(trees, input_data):
+    """
+    Przechodzi wszystkie drzewa naraz dla wszystkich wierszy surowych cech i zwraca indeksy
+    osiągniętych liści o kształcie (wiersze, drzewa) - jak estimator.apply() w scikit-learn,
+    ale z indeksami we wspólnych tablicach (przesuniętymi o trees['roots']).
+    """
+    if 'mean' in trees:
+        # Progi w przestrzeni standaryzowanej - wejście skalowane i rzutowane na float32 jak w scikit-learn
+        input_data = ((input_data - trees['mean']) / trees['scale']).astype(np.float32)
+    feature, threshold = trees['feature'], trees['threshold']
+    left, right = trees['left'], trees['right']
+    n_rows, n_features = input_data.shape
+
+    # Płaskie indeksy (np.take) są znacznie szybsze niż indeksowanie zaawansowane po dwóch osiach
+    flat_input = input_data.ravel()
+    row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+    nodes = np.broadcast_to(trees['roots'], (n_rows, len(trees['roots'])))
+    for _ in range(int(trees['depth'])):
+        go_left = np.take(flat_input, row_offsets + np.take(feature, nodes)) <= np.take(threshold, nodes)
+        nodes = np.where(go_left, np.take(left, nodes), np.take(right, nodes))
+    return nodes
+
+
+def predict_trees(trees, input_data):
+    """
+    Zwraca średnie prawdopodobieństwo klasy pozytywnej w liściach osiągniętych przez wszystkie drzewa
+    (jak RandomForestClassifier.predict_proba).
+    """
+    probabilities = trees['value'][apply_trees(trees, input_data)].mean(axis=1, dtype=np.float64)
+    # Wartości liści kwantyzowane do liczb całkowitych (quantize_trees) są skalowane z powrotem do [0, 1]
+    return probabilities * trees['value_scale'] if 'value_scale' in trees else probabilities
+
+
+class CompiledModels:
+    """
+    Lekki silnik inferencji działający na tablicach z compile_models(),
+    bez walidacji i narzutu wywołań scikit-learn przy każdym żądaniu.
+    Przyjmuje surowe (nieskalowane) cechy i zwraca prawdopodobieństwa klasy pozytywnej.
+    """
+
+    def __init__(self, arrays):
+        if int(arrays['format_version']) != COMPILED_FORMAT_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja skompilowanych modeli: {int(arrays['format_version'])}")
+        self.arrays = arrays
+        self.n_features = int(arrays['n_features'])
+
+    @classmethod
+    def from_estimators(cls, models, scaler, precision='float64'):
+        """Kompiluje modele scikit-learn bezpośrednio w pamięci."""
+        return cls(compile_models(models, scaler, precision))
+
+    def predict_model(self, model_key, input_data):
+        """
+        Zwraca ndarray prawdopodobieństw klasy pozytywnej jednego modelu (rf, lr lub dt)
+        dla macierzy surowych cech o kształcie (wiersze, n_features).
+        """
+        arrays = self.arrays[model_key]
+        if model_key == 'lr':
+            decision = input_data @ arrays['coef'] + arrays['intercept']
+            return 1.0 / (1.0 + np.exp(-decision))
+        return predict_trees(arrays, input_data)
+
+    def predict_proba(self, input_data):
+        """
+        Zwraca {klucz_modelu: ndarray prawdopodobieństw} dla macierzy surowych cech.
+        """
+        input_data = np.asarray(input_data, dtype=np.float64).reshape(-1, self.n_features)
+        return {model_key: self.predict_model(model_key, input_data) for model_key in ('rf', 'lr', 'dt')}
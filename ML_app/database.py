@@ -0,0 +1,89 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Adres bazy danych - domyślnie plik SQLite w katalogu instance aplikacji.
+# Inny silnik (np. postgresql://...) można wskazać zmienną środowiskową DATABASE_URL.
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///predictions.db')
+
+# Rozmiar puli połączeń dla serwerów wielowątkowych (połączenia stałe i dodatkowe)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '20'))
+
+# Maksymalny czas oczekiwania na zwolnienie blokady bazy SQLite (ms), zamiast natychmiastowego "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+# Ustawienia SQLite nadawane każdemu nowemu połączeniu:
+#   journal_mode=WAL     - odczyty nie blokują zapisu i odwrotnie
+#   synchronous=NORMAL   - fsync tylko przy checkpoincie WAL (bezpieczne w trybie WAL)
+#   cache_size=-65536    - 64 MB pamięci podręcznej stron na połączenie (wartość ujemna w KB)
+#   mmap_size=268435456  - odczyt pliku bazy przez mmap (do 256 MB)
+#   temp_store=MEMORY    - tabele tymczasowe (np. przy sortowaniu) w pamięci
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS
+}
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def engine_options(url):
+    """
+    Zwraca opcje create_engine dla danego adresu bazy danych.
+    Dla SQLite połączenia mogą być przekazywane między wątkami z puli, a dla innych
+    silników połączenia są sprawdzane przed użyciem i odnawiane po pół godzinie.
+    """
+    options = {'pool_size': DB_POOL_SIZE, 'max_overflow': DB_MAX_OVERFLOW, 'pool_timeout': 30}
+    if is_sqlite(url):
+        if make_url(url).database in (None, '', ':memory:'):
+            # Baza w pamięci istnieje tylko w obrębie jednego połączenia - bez puli
+            return {'connect_args': {'check_same_thread': False}}
+        options['connect_args'] = {'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}
+    else:
+        options.update(pool_pre_ping=True, pool_recycle=1800)
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None, pragmas=None):
+    """
+    Nadaje nowemu połączeniu SQLite ustawienia z SQLITE_PRAGMAS
+    (funkcja nasłuchująca zdarzenia 'connect' silnika SQLAlchemy).
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in (pragmas or SQLITE_PRAGMAS).items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def resolve_database_url(url=DATABASE_URL, instance_path='instance'):
+    """
+    Zwraca adres bazy dla skryptów uruchamianych poza aplikacją Flask. Względną ścieżkę pliku SQLite
+    rozwiązuje względem katalogu instance, tak jak Flask-SQLAlchemy w aplikacji.
+    """
+    parsed = make_url(url)
+    if is_sqlite(url) and parsed.database not in (None, '', ':memory:') and not os.path.isabs(parsed.database):
+        return parsed.set(database=os.path.join(instance_path, parsed.database)).render_as_string(hide_password=False)
+    return url
+
+
+def configure_database(app):
+    """
+    Ustawia adres bazy i opcje silnika w konfiguracji aplikacji (przed db.init_app).
+    Wartości ustawione wcześniej w app.config mają pierwszeństwo.
+    """
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', DATABASE_URL)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+
+def tune_engine(engine):
+    """Rejestruje ustawienia SQLite dla połączeń silnika (dla innych silników nic nie robi)."""
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', apply_sqlite_pragmas)
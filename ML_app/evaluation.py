@@ -0,0 +1,55 @@
+import numpy as np
+from sklearn.calibration import calibration_curve
+from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+
+# Liczba przedziałów krzywej kalibracji
+CALIBRATION_BINS = 10
+
+# Metryki liczbowe uśredniane po foldach walidacji krzyżowej
+SCALAR_METRICS = ('accuracy', 'precision', 'recall', 'f1', 'roc_auc', 'brier', 'log_loss')
+
+
+def evaluate_probabilities(y_true, probability, threshold=0.5, n_bins=CALIBRATION_BINS):
+    """
+    Wylicza wszystkie metryki z jednego wektora prawdopodobieństw klasy pozytywnej
+    (model.predict_proba jest wywoływany raz, a etykiety wyprowadzane progiem jak w inference.apply_thresholds).
+    Zwraca słownik gotowy do zapisu w JSON: dokładność, precyzja, czułość, F1, ROC-AUC, Brier, log loss,
+    macierz pomyłek [[TN, FP], [FN, TP]] i krzywą kalibracji.
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    probability = np.asarray(probability, dtype=np.float64)
+    y_pred = (probability > threshold).astype(np.int64)
+    tn, fp, fn, tp = (int(count) for count in np.bincount(2 * y_true + y_pred, minlength=4))
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    both_classes = tn + fp > 0 and fn + tp > 0
+    fraction_positive, mean_predicted = (calibration_curve(y_true, probability, n_bins=n_bins)
+                                         if both_classes else ([], []))
+    return {
+        'samples': len(y_true),
+        'accuracy': (tp + tn) / len(y_true),
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'roc_auc': float(roc_auc_score(y_true, probability)) if both_classes else None,
+        'brier': float(brier_score_loss(y_true, probability)),
+        'log_loss': float(log_loss(y_true, np.clip(probability, 1e-15, 1 - 1e-15), labels=[0, 1])),
+        'confusion_matrix': [[tn, fp], [fn, tp]],
+        'calibration': {'mean_predicted': [float(value) for value in mean_predicted],
+                        'fraction_positive': [float(value) for value in fraction_positive]}
+    }
+
+
+def summarize_folds(fold_metrics):
+    """
+    Łączy metryki foldów walidacji krzyżowej: średnia i odchylenie standardowe metryk liczbowych
+    oraz zsumowana macierz pomyłek.
+    """
+    summary = {'folds': len(fold_metrics)}
+    for name in SCALAR_METRICS:
+        values = [metrics[name] for metrics in fold_metrics if metrics[name] is not None]
+        summary[name] = {'mean': float(np.mean(values)), 'std': float(np.std(values))} if values else None
+    summary['confusion_matrix'] = np.sum([metrics['confusion_matrix'] for metrics in fold_metrics],
+                                         axis=0).tolist()
+    return summary
@@ -1,132 +1,323 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+import io
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import LoginManager, login_required, current_user
-import joblib
-from models import db, User, HeartDiseasePrediction, DiabetesPrediction, LungCancerPrediction
-from auth import auth
-
-# Konfiguracja dla różnych zbiorów danych - definiuje cechy i ich opisy dla każdego typu predykcji
-DATASETS_CONFIG = {
-    'heart_disease': {
-        'features': [
-            ('sex', 'Płeć pacjenta (0 = kobieta, 1 = mężczyzna)'),
-            ('age', 'Wiek pacjenta'),
-            ('cp', 'Typ bólu w klatce piersiowej'),
-            ('trestbps', 'Ciśnienie tętnicze krwi w spoczynku'),
-            ('chol', 'Poziom cholesterolu'),
-            ('fbs', 'Cukier we krwi na czczo'),
-            ('restecg', 'Wyniki EKG spoczynkowego'),
-            ('thalachh', 'Maksymalne tętno'),
-            ('exng', 'Dławica wysiłkowa'),
-            ('oldpeak', 'Obniżenie odcinka ST'),
-            ('slp', 'Nachylenie odcinka ST'),
-            ('caa', 'Liczba głównych naczyń wieńcowych'),
-            ('thall', 'Wynik testu Thallium')
-        ]
-    },
-    'diabetes': {
-        'features': [
-            ('Pregnancies', 'Liczba ciąż'),
-            ('Glucose', 'Poziom glukozy'),
-            ('BloodPressure', 'Ciśnienie krwi'),
-            ('SkinThickness', 'Grubość fałdu skórnego'),
-            ('Insulin', 'Poziom insuliny'),
-            ('BMI', 'Wskaźnik masy ciała'),
-            ('DiabetesPedigreeFunction', 'Funkcja rodowodu cukrzycy'),
-            ('Age', 'Wiek')
-        ]
-    },
-    'lung_cancer': {
-        'features': [
-            ('GENDER', 'Płeć (M/F)'),
-            ('AGE', 'Wiek'),
-            ('SMOKING', 'Palenie tytoniu (1-2)'),
-            ('YELLOW_FINGERS', 'Żółte palce (1-2)'),
-            ('ANXIETY', 'Niepokój (1-2)'),
-            ('PEER_PRESSURE', 'Presja rówieśników (1-2)'),
-            ('CHRONIC DISEASE', 'Choroba przewlekła (1-2)'),
-            ('FATIGUE', 'Zmęczenie (1-2)'),
-            ('ALLERGY', 'Alergia (1-2)'),
-            ('WHEEZING', 'Świszczący oddech (1-2)'),
-            ('ALCOHOL CONSUMING', 'Spożywanie alkoholu (1-2)'),
-            ('COUGHING', 'Kaszel (1-2)'),
-            ('SHORTNESS OF BREATH', 'Duszność (1-2)'),
-            ('SWALLOWING DIFFICULTY', 'Trudności w połykaniu (1-2)'),
-            ('CHEST PAIN', 'Ból w klatce piersiowej (1-2)')
-        ]
-    }
-}
-
-# Inicjalizacja i konfiguracja aplikacji Flask
-app = Flask(__name__)
-app.config['SECRET_KEY'] = '1234'
-
-# Inicjalizacja bazy danych z użyciem skonfigurowanej aplikacji
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///predictions.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Inicjalizacja bazy danych z użyciem skonfigurowanej aplikacji
-db.init_app(app)
+from sqlalchemy import tuple_
+from sqlalchemy.orm import load_only
+import click
+from models import db, User, ApiToken, Prediction, pack_features, pack_results, migrate_legacy_predictions, init_db
+import metrics
+from auth import auth, token_required
+from database import configure_database, tune_engine
+from inference import DEFAULT_THRESHOLDS, apply_thresholds, predict_input, format_single_result
+from inference_pool import INFERENCE_THREADS, MAX_PENDING, InferencePool, PoolSaturated
+from persistence import PredictionWriter
+# model_loader nie importuje joblib ani scikit-learn - stos ML ładowany jest dopiero razem z modelami
+from model_loader import (check_for_updates, get_models, install_reload_signal, is_ready, load_listeners,
+                          load_timings, loaded_models, preload_models, start_preload, start_watcher)
+from prediction_cache import PredictionCache
+# Konfiguracja zbiorów danych (cechy, ich opisy i kodowanie) - wspólna z MultiDatasetPredictor
+from schema import DATASETS as DATASETS_CONFIG, ENCODERS, feature_names
+
+# Ścieżki aplikacji (rejestrowane w create_app)
+main = Blueprint('main', __name__)
 
 # Konfiguracja systemu logowania
 login_manager = LoginManager() # Utworzenie menedżera logowania
-login_manager.init_app(app) # Powiązanie menedżera z aplikacją
 login_manager.login_view = 'auth.login' # Ustawienie widoku logowania
 login_manager.login_message = 'Proszę się zalogować.' # Komunikat dla niezalogowanych użytkowników
 
-# Rejestracja blueprintu autoryzacji (mechanizm Flaska służący do organizacji funkcjonalności związanych z uwierzytelnianiem użytkowników)
-app.register_blueprint(auth)
+# Chroni jednokrotne uruchomienie usług tła (start_background_services)
+_services_lock = threading.Lock()
+
+# Pamięci podręczne wyników utworzonych aplikacji. Słabe referencje nie przedłużają życia
+# aplikacji tworzonych wielokrotnie w jednym procesie (benchmarki, testy)
+_prediction_caches = weakref.WeakSet()
+
+def invalidate_prediction_caches(dataset_name):
+    """Czyści wyniki zbioru danych we wszystkich pamięciach podręcznych po (ponownym) załadowaniu modeli."""
+    for prediction_cache in list(_prediction_caches):
+        prediction_cache.invalidate(dataset_name)
+
+# Rejestrowane raz przy imporcie modułu, a nie przy każdym wywołaniu create_app
+load_listeners.append(invalidate_prediction_caches)
+
+def create_app(config=None):
+    """
+    Tworzy i konfiguruje aplikację Flask (fabryka aplikacji, używana przez gunicorn.conf.py i polecenie flask).
+    config - słownik ustawień nadpisujących wartości domyślne i zmienne środowiskowe (np. w benchmarkach).
+    Nie tworzy tabel bazy danych (służy do tego polecenie flask init-db) ani nie ładuje modeli -
+    poza trybem MODEL_PRELOAD=sync robi to dopiero pierwsze żądanie (start_background_services).
+    """
+    start = time.perf_counter()
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = '1234'
+
+    # Maksymalna liczba wierszy przyjmowana w jednym żądaniu predykcji zbiorczej
+    app.config['MAX_BATCH_ROWS'] = 50000
+
+    # Liczba predykcji na jednej stronie historii
+    app.config['HISTORY_PAGE_SIZE'] = 50
+
+    # Progi decyzyjne dla poszczególnych modeli (rf, lr, dt)
+    app.config['DECISION_THRESHOLDS'] = dict(DEFAULT_THRESHOLDS)
+
+    # Pamięć podręczna wyników predykcji pojedynczych wierszy (powtarzane formularze):
+    # maksymalna liczba wpisów (0 wyłącza) i czas ważności wpisu w sekundach
+    app.config['PREDICTION_CACHE_SIZE'] = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+    app.config['PREDICTION_CACHE_TTL'] = int(os.environ.get('PREDICTION_CACHE_TTL', '3600'))
+
+    # Metryki w formacie Prometheusa pod /metrics: 'full' - czasy etapów i modeli,
+    # 'basic' - tylko czasy żądań i liczniki (minimalny narzut), 'off' - wyłączone
+    app.config['METRICS_MODE'] = os.environ.get('METRICS_MODE', 'full')
+
+    # Wstępne, równoległe ładowanie i rozgrzewanie modeli wszystkich zbiorów danych:
+    # 'background' - w wątku tła uruchamianym przy pierwszym żądaniu, 'sync' - w create_app, przed przyjęciem
+    # żądań (np. w procesie master gunicorna, aby workery współdzieliły pamięć modeli po fork),
+    # 'off' - leniwie przy pierwszym żądaniu danego zbioru
+    app.config['MODEL_PRELOAD'] = os.environ.get('MODEL_PRELOAD', 'background')
+
+    # Przeładowanie modeli bez restartu serwera po zapisaniu nowej wersji (models/<zbiór>/CURRENT):
+    # obserwowanie wskaźnika co MODEL_WATCH_INTERVAL sekund (0 wyłącza), sygnał SIGHUP
+    # lub żądanie POST /admin/reload z nagłówkiem X-Admin-Token równym ADMIN_TOKEN
+    app.config['MODEL_WATCH_INTERVAL'] = float(os.environ.get('MODEL_WATCH_INTERVAL', '10'))
+    app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+
+    # Zapis predykcji do bazy: 'async' - w tle, zbiorczymi transakcjami (write-behind),
+    # 'sync' - przed zwróceniem odpowiedzi (np. w testach, gdy wynik ma być od razu widoczny w historii)
+    app.config['PREDICTION_WRITE_MODE'] = os.environ.get('PREDICTION_WRITE_MODE', 'async')
+
+    # API predykcji (/api/v1/...): inferencja w ograniczonej puli wątków - liczba wątków (API_INFERENCE_THREADS),
+    # maksymalna liczba oczekujących zadań, po przekroczeniu której zwracane jest 503 (API_MAX_PENDING),
+    # oraz maksymalny czas oczekiwania na wynik w sekundach (API_TIMEOUT)
+    app.config['API_INFERENCE_THREADS'] = int(os.environ.get('API_INFERENCE_THREADS', INFERENCE_THREADS))
+    app.config['API_MAX_PENDING'] = int(os.environ.get('API_MAX_PENDING', MAX_PENDING))
+    app.config['API_TIMEOUT'] = float(os.environ.get('API_TIMEOUT', '30'))
+
+    app.config.update(config or {})
+
+    # Konfiguracja bazy danych (adres z DATABASE_URL, pula połączeń, ustawienia SQLite - moduł database)
+    configure_database(app)
+
+    # Inicjalizacja bazy danych z użyciem skonfigurowanej aplikacji
+    db.init_app(app)
+    with app.app_context():
+        tune_engine(db.engine)
+
+    # Powiązanie menedżera logowania z aplikacją
+    login_manager.init_app(app)
+
+    # Rejestracja blueprintu autoryzacji (mechanizm Flaska służący do organizacji funkcjonalności związanych z uwierzytelnianiem użytkowników)
+    app.register_blueprint(auth)
+    app.register_blueprint(main)
+
+    metrics.init_app(app)
+
+    # Usługi aplikacji dostępne w widokach przez current_app.extensions
+    app.extensions['prediction_writer'] = PredictionWriter(app, app.config['PREDICTION_WRITE_MODE'])
+    # Wyniki są czyszczone przy każdym (ponownym) załadowaniu modeli zbioru danych
+    prediction_cache = PredictionCache(app.config['PREDICTION_CACHE_SIZE'], app.config['PREDICTION_CACHE_TTL'])
+    _prediction_caches.add(prediction_cache)
+    app.extensions['prediction_cache'] = prediction_cache
+    app.extensions['inference_pool'] = InferencePool(app.config['API_INFERENCE_THREADS'],
+                                                     app.config['API_MAX_PENDING'])
+
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_predictions_command)
+    app.cli.add_command(create_api_token_command)
+
+    install_reload_signal(DATASETS_CONFIG.keys())
+    app.before_request(lambda: start_background_services(app))
+
+    # Czas tworzenia aplikacji (bez ładowania modeli), raportowany w /health/ready i /metrics
+    app.config['STARTUP_SECONDS'] = time.perf_counter() - start
+    if app.config['MODEL_PRELOAD'] == 'sync':
+        start_background_services(app)
+    return app
+
+def start_background_services(app):
+    """
+    Uruchamia wstępne ładowanie modeli (MODEL_PRELOAD) i wątek obserwujący nowe wersje (MODEL_WATCH_INTERVAL).
+    Wywoływana przy pierwszym żądaniu, dzięki czemu polecenia CLI (np. flask routes, flask init-db)
+    nie ładują modeli ani nie uruchamiają wątków. Kolejne wywołania niczego nie zmieniają.
+    """
+    if app.extensions.get('background_services'):
+        return
+    with _services_lock:
+        if app.extensions.get('background_services'):
+            return
+        app.extensions['background_services'] = True
+
+    if app.config['MODEL_PRELOAD'] == 'sync':
+        preload_models(DATASETS_CONFIG.keys())
+    elif app.config['MODEL_PRELOAD'] == 'background':
+        start_preload(DATASETS_CONFIG.keys())
+    if app.config['MODEL_WATCH_INTERVAL'] > 0:
+        start_watcher(DATASETS_CONFIG.keys(), app.config['MODEL_WATCH_INTERVAL'])
 
 # Funkcja pomocnicza dla Flask-Login, ładująca użytkownika na podstawie ID
 @login_manager.user_loader
 def load_user(id):
     return User.query.get(int(id)) # Pobranie użytkownika z bazy danych po ID
 
-# Tworzenie wszystkich tabel w bazie danych
-with app.app_context():
-    db.create_all()
-
-# Słownik przechowujący załadowane modele ML
-loaded_models = {}
-
-def load_models(dataset_name):
+@click.command('init-db')
+def init_db_command():
     """
-    Ładuje modele uczenia maszynowego dla wybranego zbioru danych.
-    Modele są ładowane tylko raz i przechowywane w pamięci.
+    Tworzy tabele bazy danych i przenosi predykcje z dawnych tabel (jeśli istnieją).
+    Wywołanie wielokrotne niczego nie zmienia.
     """
-    if dataset_name not in loaded_models:
-        models_dir = f'models/{dataset_name}'
-        loaded_models[dataset_name] = {
-            'rf': joblib.load(f'{models_dir}/rf_model.joblib'), # Random Forest
-            'lr': joblib.load(f'{models_dir}/lr_model.joblib'), # Logistic Regression
-            'dt': joblib.load(f'{models_dir}/dt_model.joblib'), # Decision Tree
-            'scaler': joblib.load(f'{models_dir}/scaler.joblib') # Standaryzator danych
-        }
+    init_db()
+    print("Baza danych gotowa")
+
+@click.command('migrate-predictions')
+def migrate_predictions_command():
+    """Przenosi predykcje z dawnych tabel (po jednej na zbiór danych) do wspólnej tabeli prediction."""
+    print(f"Przeniesiono predykcji: {migrate_legacy_predictions()}")
+
+@click.command('create-api-token')
+@click.argument('username')
+@click.option('--name', default='default', help='Nazwa tokenu')
+def create_api_token_command(username, name):
+    """Tworzy token API dla użytkownika i wypisuje go (token nie jest nigdzie zapisywany w postaci jawnej)."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"Nie znaleziono użytkownika: {username}")
+    api_token, token = ApiToken.issue(user, name)
+    db.session.add(api_token)
+    db.session.commit()
+    print(token)
+
+# Wskaźniki odczytywane przy każdym pobraniu /metrics (z usług aplikacji obsługującej żądanie)
+metrics.Gauge('app_startup_seconds', 'Czas utworzenia aplikacji (create_app)', (),
+              lambda: [((), current_app.config['STARTUP_SECONDS'])])
+metrics.Gauge('model_load_duration_seconds', 'Czas ostatniego ładowania i rozgrzewania modeli',
+              ('dataset', 'phase'),
+              lambda: [((name, phase), seconds) for name, timings in list(load_timings.items())
+                       for phase, seconds in timings.items()])
+metrics.Gauge('prediction_cache_lookups_total', 'Trafienia i chybienia pamięci podręcznej wyników', ('result',),
+              lambda: [(('hit',), current_app.extensions['prediction_cache'].hits),
+                       (('miss',), current_app.extensions['prediction_cache'].misses)],
+              metric_type='counter')
+metrics.Gauge('prediction_cache_entries', 'Liczba wpisów w pamięci podręcznej wyników', (),
+              lambda: [((), current_app.extensions['prediction_cache'].stats()['entries'])])
+metrics.Gauge('api_inference_pending', 'Liczba zadań API oczekujących lub wykonywanych w puli inferencji', (),
+              lambda: [((), current_app.extensions['inference_pool'].pending())])
 
 def prepare_input_data(dataset_name, form_data):
     """
     Przygotowuje dane wejściowe do formatu akceptowanego przez modele.
-    Konwertuje dane z formularza na odpowiedni format numeryczny.
+    Koduje dane z formularza prekompilowanym koderem schematu (kolejność cech jak w modelach).
     """
-    features = DATASETS_CONFIG[dataset_name]['features']
-    input_data = []
+    return ENCODERS[dataset_name].encode(form_data)
 
-    for feature_name, _ in features:
-        value = form_data[feature_name]
-        if dataset_name == 'lung_cancer' and feature_name == 'GENDER':
-            value = 1 if value.upper() == 'M' else 0
-        input_data.append(float(value))
+def prepare_batch_data(dataset_name, frame):
+    """
+    Przygotowuje wiele wierszy naraz jako jedną macierz NumPy.
+    Kolumny są ustawiane w kolejności cech, a cechy kategoryczne kodowane wektorowo.
+    """
+    return ENCODERS[dataset_name].encode_frame(frame)
 
-    return input_data
+def build_prediction_records(dataset_name, input_data, results):
+    """
+    Buduje rekordy tabeli prediction (słowniki kolumna -> wartość) dla każdego wiersza
+    macierzy cech i odpowiadających mu wyników modeli. Cechy i wyniki są pakowane do blobów.
+    """
+    return [
+        {'dataset': dataset_name, 'features': features, 'probabilities': probabilities, 'labels': labels}
+        for features, (probabilities, labels) in zip(pack_features(input_data), pack_results(results))
+    ]
+
+def encode_cursor(prediction):
+    """
+    Kursor stronicowania historii - pozycja ostatniego wyświetlonego wiersza (timestamp, id).
+    """
+    return f"{prediction.timestamp.strftime('%Y%m%d%H%M%S%f')}-{prediction.id}"
+
+def decode_cursor(cursor):
+    """
+    Odczytuje kursor zapisany przez encode_cursor(). Zwraca krotkę (timestamp, id).
+    """
+    timestamp, _, prediction_id = cursor.partition('-')
+    return datetime.strptime(timestamp, '%Y%m%d%H%M%S%f'), int(prediction_id)
+
+def read_batch_request(dataset_name):
+    """
+    Odczytuje wiersze z żądania zbiorczego (JSON lub CSV) do DataFrame.
+    JSON: {"rows": [{cecha: wartość, ...}, ...]} lub {"rows": [[wartości w kolejności cech], ...]}
+    CSV: treść żądania (text/csv) lub plik przesłany w polu 'file'.
+    pandas importowany jest dopiero tutaj (nie przy starcie aplikacji).
+    """
+    import pandas as pd
+
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if payload is None:
+            raise ValueError("Nieprawidłowy JSON w treści żądania")
+        rows = payload.get('rows') if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not rows:
+            raise ValueError("Pole 'rows' musi być niepustą listą wierszy")
+        if isinstance(rows[0], dict):
+            return pd.DataFrame.from_records(rows)
+        return pd.DataFrame(rows, columns=feature_names(dataset_name))
+
+    if 'file' in request.files:
+        return pd.read_csv(request.files['file'])
+    return pd.read_csv(io.BytesIO(request.get_data()))
+
+# Ścieżki sprawdzania stanu aplikacji (np. dla load balancera lub orkiestratora)
+@main.route('/health/live')
+def health_live():
+    """Proces działa i przyjmuje żądania"""
+    return jsonify({'status': 'ok'})
+
+@main.route('/health/ready')
+def health_ready():
+    """
+    Aplikacja jest gotowa dopiero po załadowaniu i rozgrzaniu wszystkich modeli.
+    Do tego czasu zwraca 503.
+    """
+    body = {'status': 'ready' if is_ready() else 'loading', 'timings': load_timings,
+            'versions': {name: pipeline.version for name, pipeline in loaded_models.items()},
+            'prediction_cache': current_app.extensions['prediction_cache'].stats(),
+            'startup_seconds': current_app.config['STARTUP_SECONDS']}
+    return jsonify(body), 200 if is_ready() else 503
+
+# Ścieżka do przeładowania modeli (np. po zapisaniu nowej wersji przez MultiDatasetPredictor)
+@main.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Ładuje w tle aktualne wersje modeli (wszystkich lub wybranego zbioru ?dataset=...)
+    i podmienia je po rozgrzaniu. Do tego czasu żądania obsługiwane są poprzednią wersją.
+    Wymaga nagłówka X-Admin-Token; bez skonfigurowanego ADMIN_TOKEN ścieżka jest wyłączona.
+    """
+    token = current_app.config['ADMIN_TOKEN']
+    if not token or request.headers.get('X-Admin-Token') != token:
+        return jsonify({'error': 'Brak uprawnień'}), 403
+
+    dataset_names = list(DATASETS_CONFIG.keys())
+    if request.args.get('dataset'):
+        if request.args['dataset'] not in DATASETS_CONFIG:
+            return jsonify({'error': 'Nieznany zbiór danych'}), 404
+        dataset_names = [request.args['dataset']]
+
+    threading.Thread(target=check_for_updates, args=(dataset_names, True),
+                     name='model-reload', daemon=True).start()
+    return jsonify({'status': 'reloading', 'datasets': dataset_names}), 202
 
 # Ścieżka dla strony głównej
-@app.route('/')
+@main.route('/')
 @login_required
 def index():
     """Strona główna - wyświetla listę dostępnych zbiorów danych"""
     return render_template('index.html', datasets=DATASETS_CONFIG.keys())
 
 # Ścieżka dla formularza wprowadzania danych
-@app.route('/dataset/<dataset_name>')
+@main.route('/dataset/<dataset_name>')
 @login_required
 def dataset_form(dataset_name):
     """
@@ -141,58 +332,117 @@ def dataset_form(dataset_name):
                            features=features)
 
 # Scieżka do usuwania predykcji
-@app.route('/delete_prediction/<dataset_name>/<int:prediction_id>')
+@main.route('/delete_prediction/<dataset_name>/<int:prediction_id>')
 @login_required
 def delete_prediction(dataset_name, prediction_id):
     """
     Usuwa wybraną predykcję z bazy danych
     """
     try:
-        # Wybór odpowiedniego modelu w zależności od typu danych
-        if dataset_name == 'heart_disease':
-            prediction = HeartDiseasePrediction.query.get_or_404(prediction_id)
-        elif dataset_name == 'diabetes':
-            prediction = DiabetesPrediction.query.get_or_404(prediction_id)
-        else:  # lung_cancer
-            prediction = LungCancerPrediction.query.get_or_404(prediction_id)
+        prediction = Prediction.query.filter_by(id=prediction_id, dataset=dataset_name).first_or_404()
 
         # Sprawdzenie uprawnień - tylko właściciel może usunąć predykcję
         if prediction.user_id != current_user.id:
             flash('Nie masz uprawnień do usunięcia tej predykcji.')
-            return redirect(url_for('history', dataset_name=dataset_name))
+            return redirect(url_for('.history', dataset_name=dataset_name))
 
         # Usunięcie predykcji
         db.session.delete(prediction)
         db.session.commit()
-        return redirect(url_for('history', dataset_name=dataset_name))
+        return redirect(url_for('.history', dataset_name=dataset_name))
     except Exception as e:
         return render_template('error.html', error=str(e))
 
 #Ścieżka do historii predykcji
-@app.route('/history/<dataset_name>')
+@main.route('/history/<dataset_name>')
 @login_required
 def history(dataset_name):
     """
-    Wyświetla historię predykcji dla wybranego zbioru danych
+    Wyświetla historię predykcji dla wybranego zbioru danych, stronicowaną kursorem (timestamp, id).
+    Parametr 'before' wskazuje ostatni wiersz poprzedniej strony - kolejna strona zaczyna się
+    bezpośrednio za nim w indeksie, bez OFFSET. Szczegóły wierszy pobierane są osobno (prediction_details).
     """
+    if dataset_name not in DATASETS_CONFIG:
+        return "Nieznany zbiór danych", 404
 
     try:
-        # Pobranie predykcji z bazy danych w zależności od typu
-        if dataset_name == 'heart_disease':
-            predictions = HeartDiseasePrediction.query.filter_by(user_id=current_user.id).order_by(HeartDiseasePrediction.timestamp.desc()).all()
-        elif dataset_name == 'diabetes':
-            predictions = DiabetesPrediction.query.filter_by(user_id=current_user.id).order_by(DiabetesPrediction.timestamp.desc()).all()
-        else:  # lung_cancer
-            predictions = LungCancerPrediction.query.filter_by(user_id=current_user.id).order_by(LungCancerPrediction.timestamp.desc()).all()
+        page_size = current_app.config['HISTORY_PAGE_SIZE']
+
+        # Zapytanie obsługiwane przez indeks (user_id, dataset, timestamp), tylko kolumny wyświetlane w tabeli
+        query = (Prediction.query
+                 .options(load_only(Prediction.id, Prediction.dataset, Prediction.timestamp,
+                                    Prediction.features, Prediction.probabilities, Prediction.labels))
+                 .filter_by(user_id=current_user.id, dataset=dataset_name))
+        cursor = request.args.get('before')
+        if cursor:
+            try:
+                query = query.filter(tuple_(Prediction.timestamp, Prediction.id) < decode_cursor(cursor))
+            except ValueError:
+                return "Nieprawidłowy kursor stronicowania", 400
+
+        # Jeden wiersz więcej, aby sprawdzić czy istnieje kolejna strona
+        predictions = (query
+                       .order_by(Prediction.timestamp.desc(), Prediction.id.desc())
+                       .limit(page_size + 1)
+                       .all())
+        next_cursor = encode_cursor(predictions[page_size - 1]) if len(predictions) > page_size else None
 
         return render_template('history.html',
                                dataset_name=dataset_name,
-                               predictions=predictions)
+                               predictions=predictions[:page_size],
+                               next_cursor=next_cursor)
     except Exception as e:
         return render_template('error.html', error=str(e))
 
+# Ścieżka do szczegółów pojedynczej predykcji (ładowanych na żądanie z widoku historii)
+@main.route('/api/prediction/<int:prediction_id>')
+@login_required
+def prediction_details(prediction_id):
+    """
+    Zwraca w formacie JSON pełne dane wejściowe i wyniki wybranej predykcji
+    wraz z fragmentem HTML wyświetlanym po rozwinięciu wiersza historii.
+    """
+    prediction = Prediction.query.filter_by(id=prediction_id, user_id=current_user.id).first()
+    if prediction is None:
+        return jsonify({'error': 'Nie znaleziono predykcji'}), 404
+
+    features = prediction.feature_values
+    return jsonify({
+        'id': prediction.id,
+        'dataset': prediction.dataset,
+        'timestamp': prediction.timestamp.isoformat(),
+        'features': features,
+        'results': prediction.results,
+        'outcome': prediction.outcome,
+        'html': render_template('_prediction_details.html',
+                                dataset_name=prediction.dataset,
+                                features=features)
+    })
+
+@main.route('/api/prediction/<int:prediction_id>/outcome', methods=['POST'])
+@login_required
+def record_outcome(prediction_id):
+    """
+    Zapisuje rzeczywisty wynik (pole 'outcome' formularza lub JSON: 0 lub 1) dla predykcji użytkownika.
+    Predykcje z wynikiem są używane do douczania modeli (multi-dataset-predictor.py update).
+    """
+    prediction = Prediction.query.filter_by(id=prediction_id, user_id=current_user.id).first()
+    if prediction is None:
+        return jsonify({'error': 'Nie znaleziono predykcji'}), 404
+
+    payload = request.get_json(silent=True) if request.is_json else request.form
+    outcome = str((payload or {}).get('outcome', ''))
+    if outcome not in ('0', '1'):
+        return jsonify({'error': 'Wynik musi mieć wartość 0 lub 1'}), 400
+
+    prediction.outcome = int(outcome)
+    prediction.outcome_at = datetime.utcnow()
+    db.session.commit()
+    return jsonify({'id': prediction.id, 'outcome': prediction.outcome,
+                    'outcome_at': prediction.outcome_at.isoformat()})
+
 # Ścieżka do wykonywania finalnych predykcji
-@app.route('/predict/<dataset_name>', methods=['POST'])
+@main.route('/predict/<dataset_name>', methods=['POST'])
 @login_required
 def predict(dataset_name):
     """
@@ -201,7 +451,7 @@ def predict(dataset_name):
     2. Ładuje odpowiednie modele
     3. Przygotowuje dane wejściowe
     4. Wykonuje predykcję wszystkimi modelami
-    5. Zapisuje wyniki do bazy danych
+    5. Przekazuje wyniki do zapisu w bazie danych (w tle)
     6. Zwraca wyniki użytkownikowi
     """
     try:
@@ -209,117 +459,150 @@ def predict(dataset_name):
         if dataset_name not in DATASETS_CONFIG:
             return "Nieznany zbiór danych", 404
 
-        # Załadowanie modeli jeśli jeszcze nie są załadowane
-        if dataset_name not in loaded_models:
-            load_models(dataset_name)
-
-        models = loaded_models[dataset_name]
-        input_data = prepare_input_data(dataset_name, request.form)
-
-        # Walidacja liczby cech
-        expected_features = len(DATASETS_CONFIG[dataset_name]['features'])
-        if len(input_data) != expected_features:
-            raise ValueError(f"Nieprawidłowa liczba cech. Oczekiwano {expected_features}, otrzymano {len(input_data)}")
-
-        # Skalowanie danych wejściowych
-        input_scaled = models['scaler'].transform([input_data])
-
-        # Wykonanie predykcji wszystkimi modelami
-        predictions = {
-            'Random Forest': {
-                'prediction': int(models['rf'].predict(input_scaled)[0]),
-                'probability': float(models['rf'].predict_proba(input_scaled)[0][1])
-            },
-            'Logistic Regression': {
-                'prediction': int(models['lr'].predict(input_scaled)[0]),
-                'probability': float(models['lr'].predict_proba(input_scaled)[0][1])
-            },
-            'Decision Tree': {
-                'prediction': int(models['dt'].predict(input_scaled)[0]),
-                'probability': float(models['dt'].predict_proba(input_scaled)[0][1])
-            }
-        }
-
-        # Zapisz predykcje do bazy danych
-        if dataset_name == 'heart_disease':
-            prediction = HeartDiseasePrediction(
-                user_id=current_user.id,
-                sex=float(input_data[0]),
-                age=float(input_data[1]),
-                cp=float(input_data[2]),
-                trestbps=float(input_data[3]),
-                chol=float(input_data[4]),
-                fbs=float(input_data[5]),
-                restecg=float(input_data[6]),
-                thalachh=float(input_data[7]),
-                exng=float(input_data[8]),
-                oldpeak=float(input_data[9]),
-                slp=float(input_data[10]),
-                caa=float(input_data[11]),
-                thall=float(input_data[12]),
-                rf_prediction=predictions['Random Forest']['prediction'],
-                rf_probability=predictions['Random Forest']['probability'],
-                lr_prediction=predictions['Logistic Regression']['prediction'],
-                lr_probability=predictions['Logistic Regression']['probability'],
-                dt_prediction=predictions['Decision Tree']['prediction'],
-                dt_probability=predictions['Decision Tree']['probability']
-            )
-        elif dataset_name == 'diabetes':
-            prediction = DiabetesPrediction(
-                user_id=current_user.id,
-                pregnancies=float(input_data[0]),
-                glucose=float(input_data[1]),
-                blood_pressure=float(input_data[2]),
-                skin_thickness=float(input_data[3]),
-                insulin=float(input_data[4]),
-                bmi=float(input_data[5]),
-                diabetes_pedigree_function=float(input_data[6]),
-                age=float(input_data[7]),
-                rf_prediction=predictions['Random Forest']['prediction'],
-                rf_probability=predictions['Random Forest']['probability'],
-                lr_prediction=predictions['Logistic Regression']['prediction'],
-                lr_probability=predictions['Logistic Regression']['probability'],
-                dt_prediction=predictions['Decision Tree']['prediction'],
-                dt_probability=predictions['Decision Tree']['probability']
-            )
-        else:  # lung_cancer
-            prediction = LungCancerPrediction(
-                user_id=current_user.id,
-                gender=request.form['GENDER'],
-                age=float(input_data[1]),
-                smoking=float(input_data[2]),
-                yellow_fingers=float(input_data[3]),
-                anxiety=float(input_data[4]),
-                peer_pressure=float(input_data[5]),
-                chronic_disease=float(input_data[6]),
-                fatigue=float(input_data[7]),
-                allergy=float(input_data[8]),
-                wheezing=float(input_data[9]),
-                alcohol_consuming=float(input_data[10]),
-                coughing=float(input_data[11]),
-                shortness_of_breath=float(input_data[12]),
-                swallowing_difficulty=float(input_data[13]),
-                chest_pain=float(input_data[14]),
-                rf_prediction=predictions['Random Forest']['prediction'],
-                rf_probability=predictions['Random Forest']['probability'],
-                lr_prediction=predictions['Logistic Regression']['prediction'],
-                lr_probability=predictions['Logistic Regression']['probability'],
-                dt_prediction=predictions['Decision Tree']['prediction'],
-                dt_probability=predictions['Decision Tree']['probability']
-            )
-
-        # Zapisanie predykcji do bazy danych
-        db.session.add(prediction)
-        db.session.commit()
+        # Pobranie modeli (załadowanych przy starcie lub przy pierwszym użyciu)
+        pipeline = get_models(dataset_name)
+        with metrics.stage('parse', dataset_name):
+            form = request.form
+        with metrics.stage('encode', dataset_name):
+            input_data = prepare_input_data(dataset_name, form).reshape(1, -1)
+
+        # Predykcja wszystkimi modelami (jedno wywołanie pipeline'u) lub wynik z pamięci podręcznej
+        with metrics.stage('inference', dataset_name):
+            probabilities = current_app.extensions['prediction_cache'].predict_proba(pipeline, input_data)
+            results = apply_thresholds(probabilities, current_app.config['DECISION_THRESHOLDS'])
+            predictions = format_single_result(results)
+        metrics.count_predictions(dataset_name, 'single', 1, results)
+
+        # Przekazanie predykcji do zapisu w bazie danych (w tle, bez oczekiwania na transakcję)
+        with metrics.stage('persist', dataset_name):
+            records = build_prediction_records(dataset_name, input_data, results)
+            records[0]['user_id'] = current_user.id
+            current_app.extensions['prediction_writer'].submit(records)
 
         # Zwrócenie wyników
-        return render_template('result.html',
-                               dataset_name=dataset_name,
-                               predictions=predictions)
+        with metrics.stage('render', dataset_name):
+            return render_template('result.html',
+                                   dataset_name=dataset_name,
+                                   predictions=predictions)
 
     except Exception as e:
         return render_template('error.html', error=str(e))
 
-# Uruchomienie aplikacji w trybie debug
+# Ścieżka do predykcji zbiorczej wielu pacjentów naraz
+@main.route('/api/predict/<dataset_name>/batch', methods=['POST'])
+@login_required
+def predict_batch(dataset_name):
+    """
+    Wykonuje predykcje dla wielu wierszy w jednym wywołaniu:
+    1. Odczytuje wiersze z JSON lub CSV
+    2. Skaluje je jako jedną macierz
+    3. Uruchamia każdy model raz na całej macierzy
+    4. Przekazuje wyniki do zbiorczego zapisu w tle
+    5. Zwraca wyniki w formacie JSON (kolumnowo, w kolejności wierszy)
+    """
+    if dataset_name not in DATASETS_CONFIG:
+        return jsonify({'error': 'Nieznany zbiór danych'}), 404
+
+    try:
+        with metrics.stage('parse', dataset_name):
+            frame = read_batch_request(dataset_name)
+        max_rows = current_app.config['MAX_BATCH_ROWS']
+        if len(frame) > max_rows:
+            raise ValueError(f"Za dużo wierszy. Maksymalnie {max_rows}, otrzymano {len(frame)}")
+        with metrics.stage('encode', dataset_name):
+            input_data = prepare_batch_data(dataset_name, frame)
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        pipeline = get_models(dataset_name)
+
+        # Jedno wywołanie pipeline'u (skalowanie + każdy model raz) na całej macierzy
+        with metrics.stage('inference', dataset_name):
+            results = predict_input(pipeline, input_data, current_app.config['DECISION_THRESHOLDS'])
+        metrics.count_predictions(dataset_name, 'batch', len(input_data), results)
+
+        # Zbiorczy zapis wszystkich wierszy jednym insertem (w tle, przez kolejkę zapisu)
+        with metrics.stage('persist', dataset_name):
+            records = build_prediction_records(dataset_name, input_data, results)
+            for record in records:
+                record['user_id'] = current_user.id
+            current_app.extensions['prediction_writer'].submit(records)
+
+        return jsonify({
+            'dataset': dataset_name,
+            'count': len(records),
+            'results': {model_key: {'prediction': result['prediction'].tolist(),
+                                    'probability': result['probability'].tolist()}
+                        for model_key, result in results.items()}
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/v1/predict/<dataset_name>', methods=['POST'])
+@token_required
+def api_predict(dataset_name):
+    """
+    Zwraca same prawdopodobieństwa modeli (bez sesji, formularza i renderowania HTML).
+    Wymaga nagłówka "Authorization: Bearer <token>". Treść JSON:
+      {"features": {cecha: wartość, ...}} - jeden wiersz, prawdopodobieństwa jako liczby
+      {"rows": [...]}                     - wiele wierszy (jak w /api/predict/<zbiór>/batch), listy
+    Inferencja wykonywana jest w ograniczonej puli wątków na modelach współdzielonych z interfejsem WWW.
+    Przy przepełnionej puli lub niedostępnych modelach zwraca 503, a po przekroczeniu API_TIMEOUT - 504.
+    """
+    if dataset_name not in DATASETS_CONFIG:
+        return jsonify({'error': 'Nieznany zbiór danych'}), 404
+
+    try:
+        with metrics.stage('parse', dataset_name):
+            payload = request.get_json(silent=True)
+            single = isinstance(payload, dict) and 'features' in payload
+            frame = None if single else read_batch_request(dataset_name)
+        max_rows = current_app.config['MAX_BATCH_ROWS']
+        if frame is not None and len(frame) > max_rows:
+            raise ValueError(f"Za dużo wierszy. Maksymalnie {max_rows}, otrzymano {len(frame)}")
+        with metrics.stage('encode', dataset_name):
+            if single:
+                input_data = prepare_input_data(dataset_name, payload['features']).reshape(1, -1)
+            else:
+                input_data = prepare_batch_data(dataset_name, frame)
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        pipeline = get_models(dataset_name)
+    except Exception:
+        current_app.logger.exception("Nie udało się załadować modeli dla zbioru %s", dataset_name)
+        return jsonify({'error': 'Modele dla tego zbioru danych są niedostępne'}), 503
+
+    inference_pool = current_app.extensions['inference_pool']
+    try:
+        # Pojedynczy wiersz przez pamięć podręczną wyników (jak formularz), wiele wierszy - jednym wywołaniem
+        with metrics.stage('inference', dataset_name):
+            if single:
+                probabilities = inference_pool.run(current_app.extensions['prediction_cache'].predict_proba,
+                                                   pipeline, input_data, timeout=current_app.config['API_TIMEOUT'])
+            else:
+                probabilities = inference_pool.run(pipeline.predict_proba, input_data,
+                                                   timeout=current_app.config['API_TIMEOUT'])
+    except PoolSaturated:
+        return jsonify({'error': 'Serwer jest przeciążony, spróbuj ponownie później'}), 503, {'Retry-After': '1'}
+    except FutureTimeoutError:
+        return jsonify({'error': 'Przekroczono czas oczekiwania na wynik'}), 504
+    metrics.count_predictions(dataset_name, 'api', len(input_data), probabilities)
+
+    return jsonify({
+        'dataset': dataset_name,
+        'model_version': pipeline.version,
+        'probabilities': {model_key: float(probability[0]) if single else probability.tolist()
+                          for model_key, probability in probabilities.items()}
+    })
+
+# Uruchomienie aplikacji w trybie debug (serwer deweloperski tworzy tabele i ładuje modele od razu przy starcie)
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
+    start_background_services(app)
     app.run(debug=True)
\ No newline at end of file
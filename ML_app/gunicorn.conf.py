@@ -0,0 +1,28 @@
+"""
+Konfiguracja gunicorna dla wdrożeń z wieloma workerami.
+
+Uruchomienie z katalogu ML_app (tabele bazy danych tworzy wcześniej jednorazowo flask init-db):
+    flask --app flask-app init-db
+    gunicorn -c gunicorn.conf.py
+
+Aplikacja (wraz z modelami) jest ładowana raz w procesie master przed utworzeniem workerów.
+Workery dziedziczą załadowane modele po fork i współdzielą ich strony pamięci (copy-on-write),
+a tablice NumPy zmapowane z plików .joblib są dodatkowo współdzielone przez page cache.
+
+Nowa wersja modeli (models/<zbiór>/CURRENT) jest wykrywana przez wątek obserwujący,
+uruchamiany ponownie w każdym workerze po fork (MODEL_WATCH_INTERVAL).
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'flask-app:create_app()'
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import aplikacji w procesie master - modele ładowane są przed fork, a nie w każdym workerze osobno
+preload_app = True
+
+# Wątek tła nie przetrwałby fork, dlatego w procesie master modele ładowane są synchronicznie
+os.environ.setdefault('MODEL_PRELOAD', 'sync')
+os.environ.setdefault('MODEL_MMAP_MODE', 'r')
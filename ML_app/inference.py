@@ -0,0 +1,52 @@
+import numpy as np
+
+# Klucze modeli i ich nazwy wyświetlane w interfejsie
+MODEL_NAMES = {
+    'rf': 'Random Forest',
+    'lr': 'Logistic Regression',
+    'dt': 'Decision Tree'
+}
+
+# Domyślne progi decyzyjne - etykieta 1 gdy prawdopodobieństwo jest większe od progu.
+# Próg 0.5 odpowiada zachowaniu model.predict() (remis rozstrzygany na korzyść klasy 0).
+DEFAULT_THRESHOLDS = {
+    'rf': 0.5,
+    'lr': 0.5,
+    'dt': 0.5
+}
+
+
+def apply_thresholds(probabilities, thresholds=None):
+    """
+    Wyprowadza etykiety z prawdopodobieństw klasy pozytywnej przy użyciu progów decyzyjnych.
+    Zwraca słownik {klucz_modelu: {'prediction': ndarray, 'probability': ndarray}}.
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    return {
+        model_key: {
+            'prediction': (probability > thresholds[model_key]).astype(np.int64),
+            'probability': probability
+        }
+        for model_key, probability in probabilities.items()
+    }
+
+
+def predict_input(pipeline, input_data, thresholds=None):
+    """
+    Wykonuje predykcję wszystkimi modelami dla surowych (nieskalowanych) cech
+    jednym wywołaniem artefaktu ModelPipeline (skalowanie jest częścią pipeline'u).
+    """
+    return apply_thresholds(pipeline.predict_proba(input_data), thresholds)
+
+
+def format_single_result(results):
+    """
+    Zamienia wyniki dla jednego wiersza na słownik używany przez szablon result.html.
+    """
+    return {
+        MODEL_NAMES[model_key]: {
+            'prediction': int(result['prediction'][0]),
+            'probability': float(result['probability'][0])
+        }
+        for model_key, result in results.items()
+    }
@@ -0,0 +1,68 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Domyślna liczba wątków inferencji i maksymalna liczba zadań oczekujących w puli
+INFERENCE_THREADS = min(4, os.cpu_count() or 1)
+MAX_PENDING = 64
+
+
+class PoolSaturated(Exception):
+    """Pula inferencji ma już maksymalną liczbę oczekujących zadań."""
+
+
+class InferencePool:
+    """
+    Ograniczona pula wątków dla inferencji wywoływanej przez API.
+    Liczba wątków ogranicza równoległe obliczenia na CPU, a limit oczekujących zadań
+    sprawia, że przy przeciążeniu żądania są od razu odrzucane zamiast czekać w nieskończonej kolejce.
+    Pula jest tworzona leniwie w każdym procesie (wątki nie przetrwałyby fork workera gunicorna).
+    """
+
+    def __init__(self, max_workers=INFERENCE_THREADS, max_pending=MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='inference')
+                    self._pending = 0
+                    self._pending_lock = threading.Lock()
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, func, *args, timeout=None):
+        """
+        Wykonuje func(*args) w puli i zwraca wynik (czekając najwyżej timeout sekund).
+        Zgłasza PoolSaturated, gdy w puli oczekuje już max_pending zadań.
+        """
+        executor = self._get_executor()
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                raise PoolSaturated()
+            self._pending += 1
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            self._release_slot()
+            raise
+        future.add_done_callback(self._release_slot)
+        return future.result(timeout)
+
+    def _release_slot(self, future=None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def pending(self):
+        """Liczba zadań przyjętych do puli i jeszcze niezakończonych."""
+        if self._pid != os.getpid():
+            return 0
+        with self._pending_lock:
+            return self._pending
@@ -0,0 +1,225 @@
+import bisect
+import os
+import threading
+import time
+
+# Lekkie metryki aplikacji (histogramy, liczniki, wskaźniki) w formacie tekstowym Prometheusa,
+# bez zależności od prometheus_client. Liczone osobno w każdym procesie (np. workerze gunicorna).
+# Tryby (METRICS_MODE):
+#   full  - czas całych żądań, czasy poszczególnych etapów predict() i każdego modelu
+#   basic - tylko czas całych żądań i liczniki (minimalny narzut na ścieżce żądania)
+#   off   - metryki wyłączone, /metrics nie jest rejestrowane
+METRICS_MODE = os.environ.get('METRICS_MODE', 'full')
+
+# Ustawiane przez configure(): czy metryki są zbierane i czy mierzone są etapy i modele
+ENABLED = METRICS_MODE != 'off'
+DETAILED = METRICS_MODE == 'full'
+
+# Granice przedziałów histogramów czasu (s) - od 50 µs (pojedynczy model) do 10 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Wszystkie metryki w kolejności rejestracji
+REGISTRY = []
+
+
+def _format_labels(labelnames, labels, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Histogram z etykietami; obserwacje sumowane w przedziałach LATENCY_BUCKETS."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Counter:
+    """Licznik z etykietami (wartości tylko rosną)."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = list(self._values.items())
+        lines.extend(f'{self.name}{_format_labels(self.labelnames, labels)} {value}' for labels, value in values)
+        return lines
+
+
+class Gauge:
+    """
+    Wartości odczytywane w chwili pobrania metryk z funkcji collect() -> [(etykiety, wartość)].
+    metric_type='counter' dla liczników prowadzonych poza tym modułem (np. w PredictionCache).
+    """
+
+    def __init__(self, name, documentation, labelnames, collect, metric_type='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self.metric_type = metric_type
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(f'{self.name}{_format_labels(self.labelnames, labels)} {value}'
+                     for labels, value in self.collect())
+        return lines
+
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Czas obsługi żądania HTTP',
+                            ('endpoint', 'method', 'status'))
+STAGE_SECONDS = Histogram('prediction_stage_duration_seconds',
+                          'Czas etapu obsługi predykcji (parse, encode, scale, inference, persist, render)',
+                          ('stage', 'dataset'))
+MODEL_SECONDS = Histogram('model_inference_duration_seconds', 'Czas inferencji pojedynczego modelu',
+                          ('dataset', 'model'))
+DB_WRITE_SECONDS = Histogram('db_write_duration_seconds', 'Czas zapisu partii predykcji do bazy danych')
+PREDICTION_REQUESTS = Counter('prediction_requests_total', 'Liczba żądań predykcji', ('dataset', 'kind'))
+PREDICTIONS = Counter('predictions_total', 'Liczba wierszy ocenionych przez model', ('dataset', 'model'))
+DB_WRITTEN_ROWS = Counter('db_written_rows_total', 'Liczba predykcji zapisanych do bazy danych')
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'dataset', 'start')
+
+    def __init__(self, stage, dataset):
+        self.stage = stage
+        self.dataset = dataset
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage, self.dataset)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage(name, dataset):
+    """Mierzy czas etapu obsługi predykcji (with stage('encode', dataset): ...) - tylko w trybie full."""
+    return _StageTimer(name, dataset) if DETAILED else _NULL_TIMER
+
+
+def observe_model(dataset, model_key, seconds):
+    """Rejestruje czas inferencji jednego modelu - tylko w trybie full."""
+    if DETAILED:
+        MODEL_SECONDS.observe(seconds, dataset, model_key)
+
+
+def count_predictions(dataset, kind, rows, model_keys):
+    """Zlicza żądanie predykcji oraz liczbę wierszy ocenionych przez każdy model."""
+    if ENABLED:
+        PREDICTION_REQUESTS.inc(1, dataset, kind)
+        for model_key in model_keys:
+            PREDICTIONS.inc(rows, dataset, model_key)
+
+
+def observe_db_write(seconds, rows):
+    if ENABLED:
+        DB_WRITE_SECONDS.observe(seconds)
+        DB_WRITTEN_ROWS.inc(rows)
+
+
+def render():
+    """Zwraca wszystkie metryki w formacie tekstowym Prometheusa."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def configure(mode):
+    global METRICS_MODE, ENABLED, DETAILED
+    if mode not in ('full', 'basic', 'off'):
+        raise ValueError(f"Nieznany tryb metryk: {mode}")
+    METRICS_MODE, ENABLED, DETAILED = mode, mode != 'off', mode == 'full'
+
+
+def init_app(app):
+    """
+    Ustawia tryb metryk z app.config['METRICS_MODE'], mierzy czas każdego żądania
+    i rejestruje ścieżkę /metrics.
+    """
+    from flask import Response, g, request
+
+    configure(app.config.get('METRICS_MODE', METRICS_MODE))
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                    request.endpoint or 'unknown', request.method, response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,308 @@
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from inference import MODEL_NAMES, predict_input
+from schema import check_feature_order
+
+logger = logging.getLogger(__name__)
+
+# Tryb mapowania artefaktów do pamięci przy joblib.load ('r' - tylko do odczytu, 'none' - wyłączone).
+# Tablice NumPy zapisane bez kompresji są wtedy współdzielone przez procesy poprzez page cache.
+MODEL_MMAP_MODE = os.environ.get('MODEL_MMAP_MODE', 'r')
+
+# Czy używać skompilowanego silnika NumPy (compiled_models) zamiast predict_proba ze scikit-learn
+USE_COMPILED_MODELS = os.environ.get('USE_COMPILED_MODELS', '1') == '1'
+
+# Plik w katalogu zbioru danych (models/<zbiór>/CURRENT) z nazwą katalogu aktualnej wersji modeli
+CURRENT_POINTER = 'CURRENT'
+
+# Słownik przechowujący załadowane modele ML: {zbiór_danych: ModelPipeline}
+loaded_models = {}
+
+# Źródła załadowanych modeli: {zbiór_danych: (ścieżka artefaktu, czas modyfikacji)}
+loaded_sources = {}
+
+# Czasy ładowania i rozgrzewania modeli w sekundach: {zbiór_danych: {'load': .., 'warmup': ..}}
+load_timings = {}
+
+# Funkcje wywoływane po opublikowaniu nowo załadowanych modeli: fn(zbiór_danych),
+# np. czyszczenie pamięci podręcznej wyników
+load_listeners = []
+
+# Blokady chroniące ładowanie modeli pod serwerami wielowątkowymi (osobna dla każdego zbioru)
+_locks_guard = threading.Lock()
+_dataset_locks = {}
+
+# Ustawiane po zakończeniu wstępnego ładowania i rozgrzania wszystkich modeli
+_ready = threading.Event()
+
+# Konfiguracja wątku obserwującego wskaźniki CURRENT (zbiory danych, okres) oraz wątek bieżącego procesu
+_watcher_config = None
+_watcher = None
+
+
+def _dataset_lock(dataset_name):
+    with _locks_guard:
+        return _dataset_locks.setdefault(dataset_name, threading.Lock())
+
+
+def load_artifact(path, mmap_mode=None):
+    """
+    Ładuje pojedynczy artefakt joblib, mapując jego tablice NumPy tylko do odczytu,
+    jeśli plik został zapisany bez kompresji (skompresowane pliki są ładowane zwyczajnie).
+    joblib (a wraz z nim scikit-learn) importowany jest dopiero tutaj, aby sam import modułu
+    (np. przez aplikację lub polecenia CLI) nie ładował stosu ML.
+    """
+    import joblib
+    mmap_mode = mmap_mode or MODEL_MMAP_MODE
+    return joblib.load(path, mmap_mode=None if mmap_mode == 'none' else mmap_mode)
+
+
+def load_legacy_pipeline(dataset_name, models_dir):
+    """
+    Składa ModelPipeline z osobnych plików rf/lr/dt/scaler.joblib
+    (układ artefaktów sprzed wprowadzenia pipeline.joblib).
+    """
+    from pipeline import ModelPipeline
+    estimators = {model_key: load_artifact(f'{models_dir}/{model_key}_model.joblib') for model_key in MODEL_NAMES}
+    scaler = load_artifact(f'{models_dir}/scaler.joblib')
+    return ModelPipeline(dataset_name, scaler.feature_names_in_, estimators, scaler, version='legacy')
+
+
+def resolve_artifact(dataset_name, models_root='models'):
+    """
+    Zwraca ścieżkę aktualnego artefaktu modeli zbioru danych:
+      - models/<zbiór>/<wersja>/pipeline.joblib, gdy plik CURRENT wskazuje wersję,
+      - models/<zbiór>/pipeline.joblib (pojedynczy artefakt bez wersjonowania),
+      - models/<zbiór> dla starszego układu osobnych plików rf/lr/dt/scaler.joblib.
+    """
+    models_dir = f'{models_root}/{dataset_name}'
+    pointer_path = f'{models_dir}/{CURRENT_POINTER}'
+    if os.path.exists(pointer_path):
+        with open(pointer_path) as f:
+            return f'{models_dir}/{f.read().strip()}/pipeline.joblib'
+    if os.path.exists(f'{models_dir}/pipeline.joblib'):
+        return f'{models_dir}/pipeline.joblib'
+    return models_dir
+
+
+def artifact_source(path):
+    """Identyfikuje wersję artefaktu po ścieżce i czasie modyfikacji (wykrywa też podmianę pliku w miejscu)."""
+    stat_path = path if path.endswith('.joblib') else f'{path}/scaler.joblib'
+    return path, os.stat(stat_path).st_mtime_ns
+
+
+def read_pipeline(dataset_name, models_root='models'):
+    """
+    Wczytuje aktualny artefakt modeli zbioru danych bez publikowania go w loaded_models.
+    Zwraca (pipeline, źródło artefaktu).
+    """
+    path = resolve_artifact(dataset_name, models_root)
+    source = artifact_source(path)
+    if path.endswith('.joblib'):
+        pipeline = load_artifact(path)
+    else:
+        pipeline = load_legacy_pipeline(dataset_name, path)
+
+    # Kolejność cech zapisana w artefakcie musi odpowiadać schematowi używanemu przez aplikację
+    check_feature_order(dataset_name, pipeline.features)
+
+    if not USE_COMPILED_MODELS:
+        pipeline.compiled_max_rows = 0
+    return pipeline, source
+
+
+def _publish(dataset_name, pipeline, source):
+    # Podmiana jednym przypisaniem - żądania w toku kończą na poprzednim obiekcie, który już pobrały
+    loaded_models[dataset_name] = pipeline
+    loaded_sources[dataset_name] = source
+    for listener in load_listeners:
+        listener(dataset_name)
+
+
+def load_models(dataset_name, models_root='models'):
+    """
+    Ładuje modele uczenia maszynowego dla wybranego zbioru danych - aktualną wersję artefaktu
+    pipeline.joblib (lub starszy układ osobnych plików). Modele są ładowane tylko raz - równoległe
+    wywołania dla tego samego zbioru czekają na blokadzie.
+    """
+    if dataset_name in loaded_models:
+        return loaded_models[dataset_name]
+
+    with _dataset_lock(dataset_name):
+        if dataset_name in loaded_models:
+            return loaded_models[dataset_name]
+
+        start = time.perf_counter()
+        pipeline, source = read_pipeline(dataset_name, models_root)
+        load_timings.setdefault(dataset_name, {})['load'] = time.perf_counter() - start
+        # Publikacja dopiero po załadowaniu kompletnego artefaktu
+        _publish(dataset_name, pipeline, source)
+        return pipeline
+
+
+def reload_models(dataset_name, models_root='models', force=False):
+    """
+    Ładuje nową wersję modeli (wskazaną przez CURRENT lub podmieniony plik), rozgrzewa ją
+    i dopiero wtedy atomowo podmienia w loaded_models. W tym czasie żądania obsługiwane są
+    poprzednią wersją. Zwraca True, jeśli modele zostały podmienione.
+    """
+    with _dataset_lock(dataset_name):
+        current_source = artifact_source(resolve_artifact(dataset_name, models_root))
+        if not force and loaded_sources.get(dataset_name) == current_source:
+            return False
+
+        start = time.perf_counter()
+        pipeline, source = read_pipeline(dataset_name, models_root)
+        loaded = time.perf_counter()
+        warm_up_pipeline(pipeline)
+        load_timings[dataset_name] = {'load': loaded - start, 'warmup': time.perf_counter() - loaded}
+        _publish(dataset_name, pipeline, source)
+
+    logger.info("Przeładowano modele %s: wersja %s", dataset_name, pipeline.version)
+    return True
+
+
+def check_for_updates(dataset_names, force=False):
+    """
+    Przeładowuje modele zbiorów danych, dla których pojawiła się nowa wersja artefaktu
+    (force=True - niezależnie od wersji). Zwraca listę przeładowanych zbiorów.
+    """
+    reloaded = []
+    for dataset_name in dataset_names:
+        try:
+            if reload_models(dataset_name, force=force):
+                reloaded.append(dataset_name)
+        except Exception:
+            logger.exception("Nie udało się przeładować modeli dla zbioru %s - pozostaje poprzednia wersja",
+                             dataset_name)
+    return reloaded
+
+
+def _watch(dataset_names, interval):
+    while True:
+        time.sleep(interval)
+        check_for_updates(dataset_names)
+
+
+def _start_watcher_thread():
+    global _watcher
+    dataset_names, interval = _watcher_config
+    _watcher = threading.Thread(target=_watch, args=(dataset_names, interval), name='model-watcher', daemon=True)
+    _watcher.start()
+
+
+def start_watcher(dataset_names, interval):
+    """
+    Uruchamia wątek sprawdzający co interval sekund, czy zmieniła się aktualna wersja modeli.
+    Wątki nie przechodzą przez fork, więc wątek jest uruchamiany ponownie w każdym procesie
+    potomnym (np. workerach gunicorna z preload_app). Proces master gunicorna również
+    przeładowuje modele, dzięki czemu nowe workery startują od razu z aktualną wersją.
+    """
+    global _watcher_config
+    if _watcher_config is not None:
+        return
+    _watcher_config = (list(dataset_names), interval)
+    os.register_at_fork(after_in_child=_start_watcher_thread)
+    _start_watcher_thread()
+
+
+def install_reload_signal(dataset_names, signum=getattr(signal, 'SIGHUP', None)):
+    """
+    Przeładowuje modele po otrzymaniu sygnału (domyślnie SIGHUP). Samo ładowanie wykonywane
+    jest w osobnym wątku, a nie w funkcji obsługi sygnału. Pod gunicornem sygnał SIGHUP
+    obsługuje proces master (restart workerów), dlatego tam nową wersję wykrywa start_watcher().
+    """
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return
+
+    dataset_names = list(dataset_names)
+
+    def handle(signum, frame):
+        threading.Thread(target=check_for_updates, args=(dataset_names, True),
+                         name='model-reload', daemon=True).start()
+
+    signal.signal(signum, handle)
+
+
+def get_models(dataset_name):
+    """
+    Zwraca modele dla zbioru danych, ładując je przy pierwszym użyciu,
+    jeśli nie zostały wcześniej załadowane przez preload_models().
+    """
+    models = loaded_models.get(dataset_name)
+    if models is None:
+        models = load_models(dataset_name)
+    return models
+
+
+def warm_up_pipeline(pipeline):
+    """
+    Wykonuje próbną predykcję na średnim wierszu ze zbioru treningowego,
+    aby rozgrzać ścieżki kodu (walidacja, alokacje) przed pierwszym żądaniem.
+    """
+    dummy_row = pipeline.scaler.mean_.reshape(1, -1)
+    predict_input(pipeline, dummy_row)
+    # Partia większa niż compiled_max_rows rozgrzewa również ścieżkę scikit-learn
+    predict_input(pipeline, np.repeat(dummy_row, pipeline.compiled_max_rows + 1, axis=0))
+
+
+def warm_up(dataset_name):
+    """Rozgrzewa załadowane modele zbioru danych i zapisuje czas rozgrzewania."""
+    start = time.perf_counter()
+    warm_up_pipeline(loaded_models[dataset_name])
+    load_timings[dataset_name]['warmup'] = time.perf_counter() - start
+
+
+def _load_and_warm_up(dataset_name):
+    load_models(dataset_name)
+    warm_up(dataset_name)
+    return dataset_name
+
+
+def preload_models(dataset_names, max_workers=None):
+    """
+    Ładuje i rozgrzewa modele wszystkich zbiorów danych równolegle w puli wątków.
+    Po zakończeniu oznacza aplikację jako gotową (is_ready()).
+    Błąd ładowania jednego zbioru jest logowany i nie blokuje pozostałych.
+    """
+    dataset_names = list(dataset_names)
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(dataset_names)) as pool:
+        futures = {pool.submit(_load_and_warm_up, name): name for name in dataset_names}
+        for future, dataset_name in futures.items():
+            try:
+                future.result()
+                timings = load_timings[dataset_name]
+                logger.info("Załadowano modele %s: ładowanie %.3f s, rozgrzewanie %.3f s",
+                            dataset_name, timings['load'], timings['warmup'])
+            except Exception:
+                logger.exception("Nie udało się załadować modeli dla zbioru %s", dataset_name)
+
+    logger.info("Wstępne ładowanie modeli zakończone w %.3f s", time.perf_counter() - start)
+    if all(name in loaded_models for name in dataset_names):
+        _ready.set()
+    return load_timings
+
+
+def start_preload(dataset_names, max_workers=None):
+    """
+    Uruchamia preload_models() w wątku tła, aby serwer mógł od razu przyjmować
+    połączenia (np. sprawdzenia żywotności), zanim modele będą gotowe.
+    """
+    thread = threading.Thread(target=preload_models, args=(dataset_names, max_workers),
+                              name='model-preload', daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready():
+    """Zwraca True, gdy wszystkie modele zostały załadowane i rozgrzane."""
+    return _ready.is_set()
@@ -1,7 +1,12 @@
+import hashlib
+import secrets
 from datetime import datetime
+import numpy as np
+import sqlalchemy as sa
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from schema import DATASETS, feature_names
 
 # Inicjalizacja obiektu bazy danych
 db = SQLAlchemy()
@@ -16,9 +21,7 @@ class User(UserMixin, db.Model):
        password_hash: Zahashowane hasło
 
    Relacje:
-       heart_disease_predictions: Relacja z predykcjami chorób serca
-       diabetes_predictions: Relacja z predykcjami cukrzycy
-       lung_cancer_predictions: Relacja z predykcjami raka płuc
+       predictions: Relacja z predykcjami wszystkich zbiorów danych
 
    Dziedziczy po UserMixin aby zapewnić integrację z Flask-Login.
     """
@@ -26,9 +29,7 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
-    heart_disease_predictions = db.relationship('HeartDiseasePrediction', backref='user', lazy=True)
-    diabetes_predictions = db.relationship('DiabetesPrediction', backref='user', lazy=True)
-    lung_cancer_predictions = db.relationship('LungCancerPrediction', backref='user', lazy=True)
+    predictions = db.relationship('Prediction', backref='user', lazy='dynamic')
 
     def set_password(self, password):
         """
@@ -42,95 +43,203 @@ class User(UserMixin, db.Model):
         """
         return check_password_hash(self.password_hash, password)
 
-class HeartDiseasePrediction(db.Model):
+class ApiToken(db.Model):
     """
-    Model przechowujący predykcje chorób serca.
-    Zawiera zarówno dane wejściowe jak i wyniki predykcji.
+    Token dostępu do API (/api/v1/...) przypisany do użytkownika.
+    W bazie przechowywany jest tylko skrót SHA-256 tokenu - sam token jest pokazywany raz, przy utworzeniu.
     """
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Cechy wejściowe
-    sex = db.Column(db.Integer)
-    age = db.Column(db.Integer)
-    cp = db.Column(db.Integer)
-    trestbps = db.Column(db.Float)
-    chol = db.Column(db.Float)
-    fbs = db.Column(db.Integer)
-    restecg = db.Column(db.Integer)
-    thalachh = db.Column(db.Float)
-    exng = db.Column(db.Integer)
-    oldpeak = db.Column(db.Float)
-    slp = db.Column(db.Integer)
-    caa = db.Column(db.Integer)
-    thall = db.Column(db.Integer)
-
-    # Predykcje
-    rf_prediction = db.Column(db.Integer)
-    rf_probability = db.Column(db.Float)
-    lr_prediction = db.Column(db.Integer)
-    lr_probability = db.Column(db.Float)
-    dt_prediction = db.Column(db.Integer)
-    dt_probability = db.Column(db.Float)
-
-class DiabetesPrediction(db.Model):
-    """
-    Model przechowujący predykcje cukrzycy.
-    Zawiera zarówno dane wejściowe jak i wyniki predykcji.
+    name = db.Column(db.String(64), nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship('User')
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, name='default'):
+        """Tworzy token dla użytkownika i zwraca (rekord, token w postaci jawnej)."""
+        token = secrets.token_urlsafe(32)
+        return cls(user_id=user.id, name=name, token_hash=cls.hash_token(token)), token
+
+    @classmethod
+    def find_user(cls, token):
+        """Zwraca użytkownika, do którego należy token, lub None."""
+        api_token = cls.query.filter_by(token_hash=cls.hash_token(token)).first()
+        return api_token.user if api_token is not None else None
+
+# Kolejność modeli w zapisanych blobach prawdopodobieństw i w masce bitowej etykiet
+PREDICTION_MODELS = ('rf', 'lr', 'dt')
+
+# Format zapisu cech (float64) i prawdopodobieństw (float32), zawsze little-endian
+FEATURES_DTYPE = np.dtype('<f8')
+PROBABILITIES_DTYPE = np.dtype('<f4')
+
+
+def pack_features(input_data):
     """
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Cechy wejściowe
-    pregnancies = db.Column(db.Integer)
-    glucose = db.Column(db.Float)
-    blood_pressure = db.Column(db.Float)
-    skin_thickness = db.Column(db.Float)
-    insulin = db.Column(db.Float)
-    bmi = db.Column(db.Float)
-    diabetes_pedigree_function = db.Column(db.Float)
-    age = db.Column(db.Integer)
-
-    # Predykcje
-    rf_prediction = db.Column(db.Integer)
-    rf_probability = db.Column(db.Float)
-    lr_prediction = db.Column(db.Integer)
-    lr_probability = db.Column(db.Float)
-    dt_prediction = db.Column(db.Integer)
-    dt_probability = db.Column(db.Float)
-
-class LungCancerPrediction(db.Model):
-    """
-    Model przechowujący predykcje raka płuc.
-    Zawiera zarówno dane wejściowe jak i wyniki predykcji.
+    Pakuje macierz cech (wiersze w kolejności cech ze schematu) do listy blobów - jeden na wiersz.
     """
+    input_data = np.ascontiguousarray(input_data, dtype=FEATURES_DTYPE).reshape(len(input_data), -1)
+    return [row.tobytes() for row in input_data]
+
+
+def pack_results(results):
+    """
+    Pakuje wyniki modeli {klucz_modelu: {'prediction', 'probability'}} do listy par
+    (blob prawdopodobieństw float32, maska bitowa etykiet) - jedna para na wiersz.
+    Bit i maski odpowiada etykiecie modelu PREDICTION_MODELS[i].
+    """
+    probabilities = np.column_stack([results[model_key]['probability'] for model_key in PREDICTION_MODELS])
+    probabilities = np.ascontiguousarray(probabilities, dtype=PROBABILITIES_DTYPE)
+    labels = sum(np.asarray(results[model_key]['prediction'], dtype=np.int64) << bit
+                 for bit, model_key in enumerate(PREDICTION_MODELS))
+    return [(row.tobytes(), int(label)) for row, label in zip(probabilities, labels)]
+
+
+class Prediction(db.Model):
+    """
+    Predykcje wszystkich zbiorów danych w jednej, zwartej tabeli.
+    Atrybuty:
+       dataset: Nazwa zbioru danych (klucz z schema.DATASETS)
+       features: Cechy wejściowe jako blob float64 w kolejności cech ze schematu
+       probabilities: Prawdopodobieństwa modeli rf, lr, dt jako blob float32
+       labels: Etykiety modeli jako maska bitowa (bit 0 - rf, bit 1 - lr, bit 2 - dt)
+       outcome: Rzeczywisty wynik (0/1) zgłoszony po predykcji - etykieta do douczania modeli
+       outcome_at: Czas zapisania rzeczywistego wyniku (znacznik postępu douczania)
+
+    Indeks (user_id, dataset, timestamp) obsługuje filtrowanie i sortowanie historii,
+    a indeks (dataset, outcome_at, id) - pobieranie etykiet dodanych od ostatniego douczania.
+    """
+    __table_args__ = (
+        db.Index('ix_prediction_user_dataset_timestamp', 'user_id', 'dataset', 'timestamp'),
+        db.Index('ix_prediction_dataset_outcome_at', 'dataset', 'outcome_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Cechy wejściowe
-    gender = db.Column(db.String(1))
-    age = db.Column(db.Integer)
-    smoking = db.Column(db.Integer)
-    yellow_fingers = db.Column(db.Integer)
-    anxiety = db.Column(db.Integer)
-    peer_pressure = db.Column(db.Integer)
-    chronic_disease = db.Column(db.Integer)
-    fatigue = db.Column(db.Integer)
-    allergy = db.Column(db.Integer)
-    wheezing = db.Column(db.Integer)
-    alcohol_consuming = db.Column(db.Integer)
-    coughing = db.Column(db.Integer)
-    shortness_of_breath = db.Column(db.Integer)
-    swallowing_difficulty = db.Column(db.Integer)
-    chest_pain = db.Column(db.Integer)
-
-    # Predykcje
-    rf_prediction = db.Column(db.Integer)
-    rf_probability = db.Column(db.Float)
-    lr_prediction = db.Column(db.Integer)
-    lr_probability = db.Column(db.Float)
-    dt_prediction = db.Column(db.Integer)
-    dt_probability = db.Column(db.Float)
\ No newline at end of file
+    dataset = db.Column(db.String(32), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    features = db.Column(db.LargeBinary, nullable=False)
+    probabilities = db.Column(db.LargeBinary, nullable=False)
+    labels = db.Column(db.SmallInteger, nullable=False)
+    outcome = db.Column(db.SmallInteger)
+    outcome_at = db.Column(db.DateTime)
+
+    @property
+    def feature_values(self):
+        """Zdekodowane cechy wejściowe jako słownik {nazwa_cechy: wartość}."""
+        values = np.frombuffer(self.features, dtype=FEATURES_DTYPE)
+        return {
+            name: int(value) if DATASETS[self.dataset]['dtypes'][name] == 'int' else float(value)
+            for name, value in zip(feature_names(self.dataset), values)
+        }
+
+    @property
+    def results(self):
+        """Zdekodowane wyniki modeli jako słownik {klucz_modelu: {'prediction', 'probability'}}."""
+        probabilities = np.frombuffer(self.probabilities, dtype=PROBABILITIES_DTYPE)
+        return {
+            model_key: {'prediction': (self.labels >> bit) & 1, 'probability': float(probabilities[bit])}
+            for bit, model_key in enumerate(PREDICTION_MODELS)
+        }
+
+
+# Dawne tabele predykcji (po jednej na zbiór danych) i ich kolumny w kolejności cech ze schematu
+LEGACY_PREDICTION_TABLES = {
+    'heart_disease_prediction': ('heart_disease', [
+        'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
+        'thalachh', 'exng', 'oldpeak', 'slp', 'caa', 'thall'
+    ]),
+    'diabetes_prediction': ('diabetes', [
+        'pregnancies', 'glucose', 'blood_pressure', 'skin_thickness',
+        'insulin', 'bmi', 'diabetes_pedigree_function', 'age'
+    ]),
+    'lung_cancer_prediction': ('lung_cancer', [
+        'gender', 'age', 'smoking', 'yellow_fingers', 'anxiety', 'peer_pressure',
+        'chronic_disease', 'fatigue', 'allergy', 'wheezing', 'alcohol_consuming',
+        'coughing', 'shortness_of_breath', 'swallowing_difficulty', 'chest_pain'
+    ])
+}
+
+
+def migrate_legacy_predictions():
+    """
+    Przenosi predykcje z dawnych tabel (heart_disease_prediction, diabetes_prediction,
+    lung_cancer_prediction) do tabeli prediction i usuwa dawne tabele.
+    Całość wykonywana jest w jednej transakcji; zwraca liczbę przeniesionych wierszy.
+    """
+    existing_tables = set(sa.inspect(db.engine).get_table_names())
+    migrated = 0
+
+    with db.engine.begin() as connection:
+        for table_name, (dataset_name, columns) in LEGACY_PREDICTION_TABLES.items():
+            if table_name not in existing_tables:
+                continue
+
+            table = sa.Table(table_name, sa.MetaData(), autoload_with=connection)
+            rows = connection.execute(sa.select(table)).mappings().all()
+            encodings = DATASETS[dataset_name]['encodings']
+            records = []
+            for row in rows:
+                values = [row[column] for column in columns]
+                if dataset_name == 'lung_cancer':
+                    # Płeć zapisywana była w postaci tekstowej (M/F)
+                    values[0] = encodings['GENDER'][values[0]]
+                results = {
+                    model_key: {'prediction': np.array([row[f'{model_key}_prediction']]),
+                                'probability': np.array([row[f'{model_key}_probability']])}
+                    for model_key in PREDICTION_MODELS
+                }
+                probabilities, labels = pack_results(results)[0]
+                records.append({
+                    'user_id': row['user_id'],
+                    'dataset': dataset_name,
+                    'timestamp': row['timestamp'] or datetime.utcnow(),
+                    'features': pack_features(np.array([values], dtype=np.float64))[0],
+                    'probabilities': probabilities,
+                    'labels': labels
+                })
+
+            if records:
+                connection.execute(sa.insert(Prediction), records)
+            table.drop(connection)
+            migrated += len(records)
+
+    return migrated
+
+
+def init_db():
+    """
+    Tworzy brakujące tabele i przenosi predykcje z dawnych tabel (jeśli istnieją).
+    Wymaga kontekstu aplikacji.
+    Wywoływana jawnie (flask init-db), a nie przy każdym imporcie aplikacji. Zwraca liczbę przeniesionych predykcji.
+    """
+    db.create_all()
+    return migrate_legacy_predictions()
+
+
+def load_labelled_predictions(connection, dataset_name, after=None):
+    """
+    Pobiera predykcje zbioru danych z rzeczywistym wynikiem zapisanym po znaczniku after = (outcome_at, id)
+    (wszystkie, gdy after jest None), w kolejności zapisania wyniku.
+    Zwraca (macierz cech, wektor wyników, znacznik ostatniego wiersza lub None, gdy brak wierszy).
+    """
+    table = Prediction.__table__
+    query = (sa.select(table.c.id, table.c.features, table.c.outcome, table.c.outcome_at)
+             .where(table.c.dataset == dataset_name, table.c.outcome.is_not(None), table.c.outcome_at.is_not(None))
+             .order_by(table.c.outcome_at, table.c.id))
+    if after is not None:
+        query = query.where(sa.tuple_(table.c.outcome_at, table.c.id) > sa.tuple_(*after))
+    rows = connection.execute(query).all()
+
+    n_features = len(feature_names(dataset_name))
+    if not rows:
+        return np.empty((0, n_features)), np.empty(0, dtype=np.int64), None
+    features = np.frombuffer(b''.join(row.features for row in rows), dtype=FEATURES_DTYPE).reshape(-1, n_features)
+    outcomes = np.array([row.outcome for row in rows], dtype=np.int64)
+    return features.astype(np.float64), outcomes, (rows[-1].outcome_at, rows[-1].id)
@@ -2,11 +2,134 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, StratifiedKFold, ParameterSampler
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report
 import joblib
+import numpy as np
 import os
+import sys
+import json
+import shutil
+import hashlib
+import math
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pipeline import ModelPipeline
+from compiled_models import TREE_PRECISIONS
+from evaluation import evaluate_probabilities, summarize_folds
+from schema import DATASETS, feature_names
+
+# Katalog bufora przetworzonych zbiorów danych i wersja jego formatu (zmiana unieważnia bufor)
+DATASET_CACHE_DIR = 'datasets/.cache'
+DATASET_CACHE_VERSION = 1
+
+# Liczba zachowywanych wersji modeli na zbiór danych (models/<zbiór>/<wersja>) - starsze są usuwane
+MODEL_KEEP_VERSIONS = 3
+
+# Douczanie modeli nowymi predykcjami z wynikiem (tryb update): liczba drzew dodawanych do lasu losowego,
+# liczba epok i krok SGD regresji logistycznej oraz plik ze znacznikiem postępu douczania w katalogu wersji
+RF_UPDATE_TREES = 10
+LR_UPDATE_EPOCHS = 5
+LR_LEARNING_RATE = 0.05
+TRAINING_STATE_FILE = 'training.json'
+
+# Poziomy kompaktowania drzew (rf, dt): przycinanie kosztowo-złożonościowe (ccp_alpha)
+# oraz limity głębokości i minimalnej liczby próbek w liściu - nakładane na parametry modeli
+COMPACTION_LEVELS = {
+    'none': {},
+    'light': {'ccp_alpha': 0.0005, 'max_depth': 12, 'min_samples_leaf': 2},
+    'medium': {'ccp_alpha': 0.001, 'max_depth': 8, 'min_samples_leaf': 4},
+    'strong': {'ccp_alpha': 0.002, 'max_depth': 6, 'min_samples_leaf': 8}
+}
+COMPACTION_REPORT_FILE = 'compaction-report.json'
+
+# Raport ewaluacji zapisywany obok aktualnej wersji modeli
+EVALUATION_REPORT_FILE = 'evaluation.json'
+
+# Klasy modeli wraz z parametrami stałymi (niestrojonymi)
+MODEL_CLASSES = {
+    'rf': (RandomForestClassifier, {'random_state': 42}),
+    'lr': (LogisticRegression, {'random_state': 42, 'max_iter': 1000}),
+    'dt': (DecisionTreeClassifier, {'random_state': 42})
+}
+
+# Przestrzenie przeszukiwania hiperparametrów dla trybu strojenia
+PARAM_SPACES = {
+    'rf': {
+        'n_estimators': [50, 100, 200, 300],
+        'max_depth': [None, 4, 6, 8, 12, 16],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 'log2', None]
+    },
+    'lr': {
+        'C': [float(c) for c in np.logspace(-3, 2, 12)],
+        'class_weight': [None, 'balanced']
+    },
+    'dt': {
+        'max_depth': [None, 3, 4, 5, 6, 8, 10, 12],
+        'min_samples_leaf': [1, 2, 4, 8, 16],
+        'criterion': ['gini', 'entropy']
+    }
+}
+
+
+def build_model(model_name, params=None, n_jobs=None):
+    """Tworzy model o podanej nazwie z parametrami stałymi i (opcjonalnie) wybranymi hiperparametrami."""
+    model_class, fixed_params = MODEL_CLASSES[model_name]
+    model = model_class(**fixed_params, **(params or {}))
+    if n_jobs is not None and 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=n_jobs)
+    return model
+
+
+def score_candidate(model_name, params, folds, n_samples=None):
+    """
+    Zwraca średnią dokładność kandydata na zbuforowanych, już przeskalowanych foldach.
+    n_samples ogranicza liczbę wierszy treningowych (zasób w successive halving).
+    """
+    scores = []
+    for X_train, y_train, X_val, y_val in folds:
+        model = build_model(model_name, params)
+        model.fit(X_train[:n_samples], y_train[:n_samples])
+        scores.append(model.score(X_val, y_val))
+    return float(np.mean(scores))
+
+
+def median_ms(func, repeats):
+    """Zwraca medianę czasu wykonania funkcji w milisekundach."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def sgd_update_logistic(model, X, y, epochs=LR_UPDATE_EPOCHS, learning_rate=LR_LEARNING_RATE, batch_size=32, seed=42):
+    """
+    Douczanie binarnej regresji logistycznej minibatchowym SGD na nowych wierszach, startując z dotychczasowych wag.
+    Regularyzacja L2 (siła 1/C jak w LogisticRegression) przyciąga wagi do poprzedniego rozwiązania,
+    więc niewielka porcja nowych danych nie wymazuje wcześniejszej wiedzy. Koszt jest liniowy względem liczby wierszy.
+    """
+    coef = np.array(model.coef_[0], dtype=np.float64)
+    intercept = float(model.intercept_[0])
+    anchor = coef.copy()
+    penalty = 1.0 / (model.C * len(X))
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), batch_size):
+            batch = order[start:start + batch_size]
+            error = 1.0 / (1.0 + np.exp(-(X[batch] @ coef + intercept))) - y[batch]
+            coef -= learning_rate * (X[batch].T @ error / len(batch) + penalty * (coef - anchor))
+            intercept -= learning_rate * error.mean()
+    # Nowe tablice zamiast zmiany w miejscu - wagi wczytanego artefaktu mogą być zmapowane tylko do odczytu
+    model.coef_ = coef.reshape(1, -1)
+    model.intercept_ = np.array([intercept])
 
 
 class MultiDatasetPredictor:
@@ -15,64 +138,9 @@ class MultiDatasetPredictor:
         dla różnych zbiorów danych medycznych (choroby serca, cukrzyca, rak płuc).
         """
 
-    # Konfiguracja zbiorów danych - definiuje ścieżki, kolumny docelowe i cechy dla każdego zbioru
-    DATASETS_CONFIG = {
-        'heart_disease': {
-            'path': 'datasets/heart-disease.csv',
-            'target': 'target', # Kolumna zawierająca etykiety (0/1)
-            'features': [
-                # Lista krotek (nazwa_cechy, opis) dla chorób serca
-                ('age', 'Wiek pacjenta'),
-                ('sex', 'Płeć pacjenta (0 = kobieta, 1 = mężczyzna)'),
-                ('cp', 'Typ bólu w klatce piersiowej'),
-                ('trestbps', 'Ciśnienie tętnicze krwi w spoczynku'),
-                ('chol', 'Poziom cholesterolu'),
-                ('fbs', 'Cukier we krwi na czczo'),
-                ('restecg', 'Wyniki EKG spoczynkowego'),
-                ('thalach', 'Maksymalne tętno'),
-                ('exang', 'Dławica wysiłkowa'),
-                ('oldpeak', 'Obniżenie odcinka ST'),
-                ('slope', 'Nachylenie odcinka ST'),
-                ('ca', 'Liczba głównych naczyń wieńcowych'),
-                ('thal', 'Wynik testu Thallium')
-            ]
-        },
-        'diabetes': {
-            'path': 'datasets/diabetes.csv',
-            'target': 'Outcome',
-            'features': [
-                ('Pregnancies', 'Liczba ciąż'),
-                ('Glucose', 'Poziom glukozy'),
-                ('BloodPressure', 'Ciśnienie krwi'),
-                ('SkinThickness', 'Grubość fałdu skórnego'),
-                ('Insulin', 'Poziom insuliny'),
-                ('BMI', 'Wskaźnik masy ciała'),
-                ('DiabetesPedigreeFunction', 'Funkcja rodowodu cukrzycy'),
-                ('Age', 'Wiek')
-            ]
-        },
-        'lung_cancer': {
-            'path': 'datasets/survey-lung-cancer.csv',
-            'target': 'LUNG_CANCER',
-            'features': [
-                ('GENDER', 'Płeć (M/F)'),
-                ('AGE', 'Wiek'),
-                ('SMOKING', 'Palenie tytoniu (1-2)'),
-                ('YELLOW_FINGERS', 'Żółte palce (1-2)'),
-                ('ANXIETY', 'Niepokój (1-2)'),
-                ('PEER_PRESSURE', 'Presja rówieśników (1-2)'),
-                ('CHRONIC DISEASE', 'Choroba przewlekła (1-2)'),
-                ('FATIGUE', 'Zmęczenie (1-2)'),
-                ('ALLERGY', 'Alergia (1-2)'),
-                ('WHEEZING', 'Świszczący oddech (1-2)'),
-                ('ALCOHOL CONSUMING', 'Spożywanie alkoholu (1-2)'),
-                ('COUGHING', 'Kaszel (1-2)'),
-                ('SHORTNESS OF BREATH', 'Duszność (1-2)'),
-                ('SWALLOWING DIFFICULTY', 'Trudności w połykaniu (1-2)'),
-                ('CHEST PAIN', 'Ból w klatce piersiowej (1-2)')
-            ]
-        }
-    }
+    # Konfiguracja zbiorów danych - ścieżki, kolumny docelowe, cechy i kodowanie wartości.
+    # Wspólna z aplikacją Flask (schema.py), dzięki czemu kolejność cech jest zawsze zgodna.
+    DATASETS_CONFIG = DATASETS
 
     def __init__(self):
         """Inicjalizacja klasy z pustymi atrybutami"""
@@ -85,11 +153,18 @@ class MultiDatasetPredictor:
         self.X_test = None               # Zbiór testowy - cechy
         self.y_train = None              # Zbiór treningowy - etykiety
         self.y_test = None               # Zbiór testowy - etykiety
-
-    def load_dataset(self, dataset_name):
+        self.timings = {}                # Czasy poszczególnych etapów w sekundach
+        self.X_train_raw = None          # Zbiór treningowy - cechy przed skalowaniem (do walidacji krzyżowej)
+        self.fold_cache = {}             # Przeskalowane foldy walidacji krzyżowej: {liczba_foldów: [...]}
+        self.best_params = {}            # Hiperparametry wybrane w trybie strojenia
+        self.X_test_raw = None           # Zbiór testowy - cechy przed skalowaniem (do oceny skompilowanych modeli)
+        self.compiled_precision = 'float64'  # Dokładność tablic drzew w zapisywanym artefakcie
+
+    def load_dataset(self, dataset_name, use_cache=True, verbose=True):
         """
         Wczytuje i przygotowuje wybrany zbiór danych do trenowania.
-
+        Przetworzone cechy, etykiety i dopasowany skaler są buforowane (dataset_cache_dir),
+        więc kolejne uruchomienia dla niezmienionego pliku CSV pomijają parsowanie.
         """
         if dataset_name not in self.DATASETS_CONFIG:
             raise ValueError(f"Nieznany zbiór danych: {dataset_name}")
@@ -97,56 +172,144 @@ class MultiDatasetPredictor:
         config = self.DATASETS_CONFIG[dataset_name]
         self.current_dataset = dataset_name
 
-        # Wczytanie danych z pliku CSV
-        data = pd.read_csv(config['path'])
-
-        # Specjalne przetwarzanie dla zbioru danych o raku płuc
-        if dataset_name == 'lung_cancer':
-            # Sprawdzenie czy wszystkie wymagane kolumny są obecne
-            required_columns = [feature[0] for feature in config['features']] + [config['target']]
-            missing_columns = set(required_columns) - set(data.columns)
-            if missing_columns:
-                raise ValueError(f"Brakujące kolumny w zbiorze danych: {missing_columns}")
-
-            # Konwersja kolumny GENDER na wartości binarne
-            data['GENDER'] = data['GENDER'].map({'M': 1, 'F': 0})
-            # Konwersja kolumny LUNG_CANCER na wartości binarne
-            data['LUNG_CANCER'] = data['LUNG_CANCER'].map({'YES': 1, 'NO': 0})
+        cache_dir = self.dataset_cache_dir(dataset_name) if use_cache else None
+        cached = self.load_cached_dataset(dataset_name, cache_dir) if cache_dir else None
+        if cached is not None:
+            self.X, self.y, self.X_scaled, self.scaler = cached
+        else:
+            self.X, self.y = self.parse_dataset(dataset_name)
 
-            # Konwersja wszystkich kolumn na typ numeryczny
-            for column in data.columns:
-                if column != config['target']:
-                    data[column] = pd.to_numeric(data[column], errors='raise')
+            # Skalowanie danych
+            self.scaler = StandardScaler()
+            self.X_scaled = self.scaler.fit_transform(self.X)
 
-        # Przygotowanie danych do trenowania
-        feature_columns = [feature[0] for feature in config['features']]
-        self.X = data[feature_columns]
-        self.y = data[config['target']]
-
-        # Sprawdź czy liczba cech się zgadza
-        if len(self.X.columns) != len(config['features']):
-            raise ValueError(
-                f"Nieprawidłowa liczba cech. Oczekiwano {len(config['features'])}, otrzymano {len(self.X.columns)}")
-
-        # Skalowanie danych
-        self.scaler = StandardScaler()
-        self.X_scaled = self.scaler.fit_transform(self.X)
+            if cache_dir and not self.save_cached_dataset(dataset_name, cache_dir):
+                # Wpis zapisał równolegle inny proces - korzystamy z niego jak przy trafieniu w bufor
+                cached = self.load_cached_dataset(dataset_name, cache_dir)
+                if cached is not None:
+                    self.X, self.y, self.X_scaled, self.scaler = cached
 
         # Podział na zbiór treningowy i testowy
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.X_scaled, self.y, test_size=0.2, random_state=42
+        self.X_train, self.X_test, self.y_train, self.y_test, self.X_train_raw, self.X_test_raw = train_test_split(
+            self.X_scaled, self.y, self.X.to_numpy(dtype=np.float64), test_size=0.2, random_state=42
         )
+        self.fold_cache = {}
+        self.best_params = self.load_best_params()
 
         # Wyświetlenie informacji o załadowanym zbiorze
+        if not verbose:
+            return
         print(f"\nZaładowano zbiór danych {dataset_name}:")
         print(f"Liczba cech: {len(self.X.columns)}")
         print(f"Liczba próbek: {len(self.X)}")
         print("Cechy:", ", ".join(self.X.columns))
 
-    def train_models(self):
+    def parse_dataset(self, dataset_name):
+        """
+        Parsuje plik CSV zbioru danych i zwraca cechy (DataFrame) oraz etykiety (Series).
+        """
+        config = self.DATASETS_CONFIG[dataset_name]
+
+        # Wczytanie danych z pliku CSV
+        data = pd.read_csv(config['path'])
+
+        # Sprawdzenie czy wszystkie wymagane kolumny są obecne
+        required_columns = feature_names(dataset_name) + [config['target']]
+        missing_columns = set(required_columns) - set(data.columns)
+        if missing_columns:
+            raise ValueError(f"Brakujące kolumny w zbiorze danych: {missing_columns}")
+
+        # Konwersja kolumn kategorycznych (np. GENDER) i etykiet tekstowych (np. LUNG_CANCER) na wartości liczbowe
+        for column, mapping in config['encodings'].items():
+            data[column] = data[column].map(mapping)
+        if 'target_encoding' in config:
+            data[config['target']] = data[config['target']].map(config['target_encoding'])
+
+        # Konwersja wszystkich kolumn cech na typ numeryczny
+        for column in feature_names(dataset_name):
+            data[column] = pd.to_numeric(data[column], errors='raise')
+
+        # Przygotowanie danych do trenowania
+        X = data[feature_names(dataset_name)]
+        y = data[config['target']]
+
+        # Sprawdź czy liczba cech się zgadza
+        if len(X.columns) != len(config['features']):
+            raise ValueError(
+                f"Nieprawidłowa liczba cech. Oczekiwano {len(config['features'])}, otrzymano {len(X.columns)}")
+
+        return X, y
+
+    def dataset_cache_dir(self, dataset_name):
+        """
+        Zwraca katalog bufora dla zbioru danych. Klucz to skrót SHA-256 zawartości pliku CSV,
+        konfiguracji zbioru i wersji formatu - każda zmiana pliku trafia pod nowy klucz.
+        """
+        config = self.DATASETS_CONFIG[dataset_name]
+        digest = hashlib.sha256()
+        with open(config['path'], 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(json.dumps([DATASET_CACHE_VERSION, config], sort_keys=True).encode())
+        return f'{DATASET_CACHE_DIR}/{dataset_name}/{digest.hexdigest()[:32]}'
+
+    def load_cached_dataset(self, dataset_name, cache_dir):
+        """
+        Wczytuje zbuforowane macierze (mapowane z plików .npy) i skaler.
+        Zwraca None, jeśli bufora nie ma.
+        """
+        if not os.path.exists(f'{cache_dir}/meta.json'):
+            return None
+
+        with open(f'{cache_dir}/meta.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        X = pd.DataFrame(np.load(f'{cache_dir}/X.npy', mmap_mode='r'), columns=meta['features'])
+        y = pd.Series(np.load(f'{cache_dir}/y.npy'), name=meta['target'])
+        X_scaled = np.load(f'{cache_dir}/X_scaled.npy')
+        scaler = joblib.load(f'{cache_dir}/scaler.joblib')
+        print(f"Wczytano zbiór {dataset_name} z bufora {cache_dir}")
+        return X, y, X_scaled, scaler
+
+    def save_cached_dataset(self, dataset_name, cache_dir):
+        """
+        Zapisuje przetworzony zbiór do bufora: najpierw do katalogu tymczasowego, który następnie
+        jest atomowo przemianowywany. Usuwa bufory nieaktualnych wersji pliku CSV.
+        Bufor mogą równocześnie wypełniać inne procesy (np. workery evaluate_all) - zwraca False,
+        jeśli wpisu nie udało się zapisać (np. inny proces zapisał go wcześniej).
+        """
+        dataset_dir = os.path.dirname(cache_dir)
+        tmp_dir = None
+        try:
+            os.makedirs(dataset_dir, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(dir=dataset_dir, prefix='.tmp-')
+            np.save(f'{tmp_dir}/X.npy', self.X.to_numpy(dtype=np.float64))
+            np.save(f'{tmp_dir}/y.npy', self.y.to_numpy())
+            np.save(f'{tmp_dir}/X_scaled.npy', self.X_scaled)
+            joblib.dump(self.scaler, f'{tmp_dir}/scaler.joblib')
+            with open(f'{tmp_dir}/meta.json', 'w', encoding='utf-8') as f:
+                json.dump({'features': list(self.X.columns), 'target': self.y.name}, f)
+            os.replace(tmp_dir, cache_dir)
+        except OSError as e:
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.exists(f'{cache_dir}/meta.json'):
+                print(f"Nie udało się zapisać bufora zbioru {dataset_name}: {e}")
+            return False
+        except BaseException:
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        # Bufory nieaktualnych wersji pliku CSV (katalogi tymczasowe należą do zapisów w toku)
+        for entry in os.listdir(dataset_dir):
+            if entry != os.path.basename(cache_dir) and not entry.startswith('.tmp-'):
+                shutil.rmtree(f'{dataset_dir}/{entry}', ignore_errors=True)
+        return True
+
+    def train_models(self, n_jobs=-1):
         """
         Trenuje trzy różne modele klasyfikacji:
-        - Random Forest
+        - Random Forest (drzewa budowane równolegle na n_jobs rdzeniach, -1 = wszystkie)
         - Logistic Regression
         - Decision Tree
         """
@@ -155,15 +318,16 @@ class MultiDatasetPredictor:
 
         print(f"\nRozpoczęto trenowanie modeli dla zbioru {self.current_dataset}...")
 
-        # Inicjalizacja i trenowanie modeli
-        self.models['rf'] = RandomForestClassifier(random_state=42)
-        self.models['lr'] = LogisticRegression(random_state=42, max_iter=1000)
-        self.models['dt'] = DecisionTreeClassifier(random_state=42)
+        # Inicjalizacja i trenowanie modeli (z hiperparametrami ze strojenia, jeśli zostały zapisane)
+        for name in MODEL_CLASSES:
+            self.models[name] = build_model(name, self.best_params.get(name), n_jobs=n_jobs)
 
         # Trenowanie każdego modelu i wyświetlanie wyników
         for name, model in self.models.items():
             print(f"\nTrenowanie modelu {name}...")
+            start = time.perf_counter()
             model.fit(self.X_train, self.y_train)
+            self.timings[name] = time.perf_counter() - start
 
             # Obliczenie dokładności
             train_score = model.score(self.X_train, self.y_train)
@@ -172,6 +336,274 @@ class MultiDatasetPredictor:
             print(f"Dokładność na zbiorze treningowym: {train_score:.4f}")
             print(f"Dokładność na zbiorze testowym: {test_score:.4f}")
 
+    def update_models(self, dataset_name, add_trees=RF_UPDATE_TREES, lr_epochs=LR_UPDATE_EPOCHS,
+                      refit_dt=False, database_url=None, n_jobs=None):
+        """
+        Douczanie aktualnych modeli zbioru danych predykcjami z rzeczywistym wynikiem (outcome), zapisanymi
+        w bazie od ostatniego douczania (znacznik w pliku TRAINING_STATE_FILE aktualnej wersji modeli):
+        - Random Forest: warm_start - add_trees nowych drzew trenowanych na nowych wierszach
+        - Logistic Regression: lr_epochs epok SGD od dotychczasowych wag (sgd_update_logistic)
+        - Decision Tree: bez zmian, a z refit_dt - ponowne dopasowanie na CSV i wszystkich wierszach z wynikiem
+        Skaler pozostaje bez zmian, więc dotychczasowe drzewa i wagi zachowują swoją przestrzeń cech.
+        Czas douczania (poza refit_dt) zależy od liczby nowych wierszy, a nie od całej historii.
+        Zapisuje nową wersję modeli i zwraca liczbę użytych wierszy (0 - brak nowych danych, bez zapisu).
+        """
+        from sqlalchemy import create_engine
+        from database import DATABASE_URL, resolve_database_url
+        from model_loader import read_pipeline, resolve_artifact
+        from models import load_labelled_predictions
+
+        pipeline, _ = read_pipeline(dataset_name)
+        if pipeline.estimators is None:
+            raise ValueError(f"Wersja {pipeline.version} zawiera tylko skompilowane tablice "
+                             f"({pipeline.compiled_precision}) - douczanie wymaga modeli scikit-learn, "
+                             f"wytrenuj modele od nowa")
+        state = self.load_training_state(resolve_artifact(dataset_name))
+        watermark = (datetime.fromisoformat(state['watermark_at']), state['watermark_id']) if state else None
+
+        start = time.perf_counter()
+        engine = create_engine(resolve_database_url(database_url or DATABASE_URL))
+        with engine.connect() as connection:
+            X_new, y_new, last = load_labelled_predictions(connection, dataset_name, watermark)
+            history = load_labelled_predictions(connection, dataset_name) if refit_dt and last else None
+        engine.dispose()
+        self.timings['load'] = time.perf_counter() - start
+
+        if last is None:
+            print(f"\nBrak nowych predykcji z wynikiem dla zbioru {dataset_name} - modele bez zmian")
+            return 0
+
+        def scale(X):
+            return pipeline.scaler.transform(pd.DataFrame(X, columns=pipeline.features))
+
+        print(f"\nDouczanie modeli zbioru {dataset_name} (wersja {pipeline.version}) na {len(y_new)} nowych wierszach")
+        before = {model_key: np.mean((probability > 0.5) == y_new)
+                  for model_key, probability in pipeline.predict_proba(X_new).items()}
+        X_scaled = scale(X_new)
+        estimators = dict(pipeline.estimators)
+
+        start = time.perf_counter()
+        if len(np.unique(y_new)) == 2:
+            rf = estimators['rf']
+            rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + add_trees, n_jobs=n_jobs)
+            rf.fit(X_scaled, y_new)
+            rf.set_params(warm_start=False)
+        else:
+            add_trees = 0
+            print("Nowe wiersze zawierają tylko jedną klasę - Random Forest bez zmian")
+        self.timings['rf'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sgd_update_logistic(estimators['lr'], X_scaled, y_new, epochs=lr_epochs)
+        self.timings['lr'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if refit_dt:
+            self.current_dataset = dataset_name
+            X_csv, y_csv = self.parse_dataset(dataset_name)
+            estimators['dt'] = build_model('dt', self.load_best_params().get('dt'))
+            estimators['dt'].fit(np.vstack([scale(X_csv.to_numpy(dtype=np.float64)), scale(history[0])]),
+                                 np.concatenate([y_csv.to_numpy(), history[1]]))
+        self.timings['dt'] = time.perf_counter() - start
+
+        self.current_dataset = dataset_name
+        self.models = estimators
+        self.scaler = pipeline.scaler
+        self.compiled_precision = getattr(pipeline, 'compiled_precision', 'float64')
+        after = {model_key: np.mean((probability > 0.5) == y_new)
+                 for model_key, probability in ModelPipeline(dataset_name, pipeline.features, estimators,
+                                                             pipeline.scaler).predict_proba(X_new).items()}
+        for model_key in estimators:
+            print(f"{model_key}: dokładność na nowych wierszach przed douczaniem {before[model_key]:.4f}, "
+                  f"po douczaniu {after[model_key]:.4f}")
+
+        self.save_models(training_state={
+            'watermark_at': last[0].isoformat(),
+            'watermark_id': last[1],
+            'base_version': pipeline.version,
+            'rows': len(y_new),
+            'rf_added_trees': add_trees,
+            'lr_epochs': lr_epochs,
+            'dt_refit': refit_dt
+        })
+        return len(y_new)
+
+    def compact_models(self, levels=None, precisions=TREE_PRECISIONS, apply=None, n_jobs=-1):
+        """
+        Etap kompaktowania po treningu: dla każdego poziomu z COMPACTION_LEVELS trenuje Random Forest
+        i Decision Tree z przycinaniem (ccp_alpha) i limitami głębokości/liści, a następnie buduje artefakt
+        dla każdej dokładności tablic drzew (TREE_PRECISIONS). Dla każdego wariantu mierzy rozmiar artefaktu,
+        czas wczytania, opóźnienie inferencji (jeden wiersz i cały zbiór testowy), liczbę węzłów,
+        dokładność na zbiorze testowym oraz liczbę etykiet zmienionych względem predict_proba scikit-learn
+        tych samych modeli (skutek zmniejszonej dokładności tablic). Raport jest wypisywany i zapisywany jako COMPACTION_REPORT_FILE
+        w models/<zbiór>. apply=(poziom, dokładność) zapisuje wybrany wariant jako nową wersję modeli.
+        Warianty float32 i uint8 zawierają tylko skompilowane tablice (bez modeli scikit-learn), więc rozmiar,
+        czasy i dokładność w raporcie dotyczą tego samego modelu; takich wersji nie można później douczać.
+        """
+        from model_loader import load_artifact
+
+        if self.current_dataset is None:
+            raise ValueError("Najpierw wybierz zbiór danych!")
+        levels = levels or list(COMPACTION_LEVELS)
+        features = feature_names(self.current_dataset)
+        lr = build_model('lr', self.best_params.get('lr')).fit(self.X_train, self.y_train)
+
+        print(f"\nKompaktowanie modeli dla zbioru {self.current_dataset}...")
+        report, variants = [], {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for level in levels:
+                models = {'lr': lr}
+                for name in ('rf', 'dt'):
+                    params = {**self.best_params.get(name, {}), **COMPACTION_LEVELS[level]}
+                    models[name] = build_model(name, params, n_jobs=n_jobs).fit(self.X_train, self.y_train)
+                models['rf'].set_params(n_jobs=None)
+
+                for precision in precisions:
+                    pipeline = ModelPipeline(self.current_dataset, features, models, self.scaler, precision=precision)
+                    path = os.path.join(tmp, f'{level}-{precision}.joblib')
+                    joblib.dump(pipeline, path, compress=0)
+                    compiled = pipeline.compiled.predict_proba(self.X_test_raw)
+                    reference = {name: models[name].predict_proba(self.X_test)[:, 1] for name in ('rf', 'lr', 'dt')}
+                    report.append({
+                        'level': level,
+                        'precision': precision,
+                        'size_bytes': os.path.getsize(path),
+                        'load_ms': median_ms(lambda: load_artifact(path), 5),
+                        'row_ms': median_ms(lambda: pipeline.predict_proba(self.X_test_raw[:1]), 200),
+                        'batch_ms': median_ms(lambda: pipeline.predict_proba(self.X_test_raw), 20),
+                        'nodes': {name: int(sum(tree.tree_.node_count for tree in models[name].estimators_))
+                                  if name == 'rf' else int(models[name].tree_.node_count) for name in ('rf', 'dt')},
+                        'accuracy': {name: float(np.mean((compiled[name] > 0.5) == self.y_test))
+                                     for name in ('rf', 'lr', 'dt')},
+                        'label_flips': {name: int(np.sum((compiled[name] > 0.5) != (reference[name] > 0.5)))
+                                        for name in ('rf', 'lr', 'dt')}
+                    })
+                    variants[level, precision] = models
+
+        print(f"{'poziom':<8}{'dokładność':<11}{'rozmiar [kB]':>13}{'wczytanie [ms]':>15}{'wiersz [ms]':>12}"
+              f"{'zbiór [ms]':>11}{'węzły rf':>10}{'węzły dt':>10}{'acc rf':>8}{'acc dt':>8}{'zmiany rf':>10}"
+              f"{'zmiany dt':>10}")
+        for row in report:
+            print(f"{row['level']:<8}{row['precision']:<11}{row['size_bytes'] / 1024:>13.1f}{row['load_ms']:>15.2f}"
+                  f"{row['row_ms']:>12.3f}{row['batch_ms']:>11.3f}{row['nodes']['rf']:>10}{row['nodes']['dt']:>10}"
+                  f"{row['accuracy']['rf']:>8.4f}{row['accuracy']['dt']:>8.4f}{row['label_flips']['rf']:>10}"
+                  f"{row['label_flips']['dt']:>10}")
+
+        model_dir = f'models/{self.current_dataset}'
+        os.makedirs(model_dir, exist_ok=True)
+        self.atomic_write_text(json.dumps({'dataset': self.current_dataset, 'levels': COMPACTION_LEVELS,
+                                           'variants': report}, indent=2), f'{model_dir}/{COMPACTION_REPORT_FILE}')
+        print(f"Raport zapisano do {model_dir}/{COMPACTION_REPORT_FILE}")
+
+        if apply is not None:
+            if tuple(apply) not in variants:
+                raise ValueError(f"Wariant {apply[0]}/{apply[1]} nie został zbudowany")
+            self.models = variants[tuple(apply)]
+            self.compiled_precision = apply[1]
+            self.save_models()
+        return report
+
+    @staticmethod
+    def load_training_state(artifact_path):
+        """
+        Wczytuje znacznik postępu douczania zapisany obok artefaktu modeli
+        (None dla modeli wytrenowanych od zera - douczanie użyje wtedy wszystkich wierszy z wynikiem).
+        """
+        state_dir = os.path.dirname(artifact_path) if artifact_path.endswith('.joblib') else artifact_path
+        path = os.path.join(state_dir, TRAINING_STATE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def get_folds(self, cv=5):
+        """
+        Zwraca foldy walidacji krzyżowej zbioru treningowego jako listę krotek
+        (X_train, y_train, X_val, y_val). Skaler jest dopasowywany osobno w każdym foldzie,
+        a wynik jest buforowany - wszyscy kandydaci korzystają z tych samych macierzy.
+        Wiersze treningowe każdego foldu są przetasowane, aby prefiks nadawał się na podpróbkę.
+        """
+        if cv not in self.fold_cache:
+            folds = []
+            y_train = np.asarray(self.y_train)
+            splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=42)
+            rng = np.random.default_rng(42)
+            for train_idx, val_idx in splitter.split(self.X_train_raw, y_train):
+                train_idx = rng.permutation(train_idx)
+                scaler = StandardScaler().fit(self.X_train_raw[train_idx])
+                folds.append((
+                    np.ascontiguousarray(scaler.transform(self.X_train_raw[train_idx])), y_train[train_idx],
+                    np.ascontiguousarray(scaler.transform(self.X_train_raw[val_idx])), y_train[val_idx]
+                ))
+            self.fold_cache[cv] = folds
+        return self.fold_cache[cv]
+
+    def tune_models(self, search='random', n_iter=20, cv=5, n_jobs=-1, factor=3):
+        """
+        Stroi hiperparametry rf, lr i dt walidacją krzyżową:
+        - 'random': losowe przeszukiwanie n_iter kandydatów na modelu
+        - 'halving': successive halving - kandydaci oceniani na rosnącej liczbie wierszy,
+          w każdej rundzie zostaje najlepsza 1/factor część
+        Kandydaci są oceniani równolegle (n_jobs procesów) na zbuforowanych foldach.
+        Najlepsza konfiguracja jest zapisywana obok artefaktów modeli (best_params.json).
+        """
+        if self.current_dataset is None:
+            raise ValueError("Najpierw wybierz zbiór danych!")
+        if search not in ('random', 'halving'):
+            raise ValueError(f"Nieznana metoda przeszukiwania: {search}")
+
+        print(f"\nStrojenie hiperparametrów dla zbioru {self.current_dataset} ({search}, {cv} foldów)...")
+        folds = self.get_folds(cv)
+        results = {}
+
+        with joblib.Parallel(n_jobs=n_jobs) as parallel:
+            for name, space in PARAM_SPACES.items():
+                start = time.perf_counter()
+                candidates = list(ParameterSampler(space, n_iter=n_iter, random_state=42))
+
+                if search == 'random':
+                    scores = parallel(joblib.delayed(score_candidate)(name, params, folds) for params in candidates)
+                else:
+                    n_train = len(folds[0][1])
+                    n_rounds = max(1, math.ceil(math.log(len(candidates), factor)))
+                    n_samples = max(20, n_train // factor ** (n_rounds - 1))
+                    while True:
+                        scores = parallel(joblib.delayed(score_candidate)(name, params, folds, n_samples)
+                                          for params in candidates)
+                        if len(candidates) <= 1 or n_samples >= n_train:
+                            break
+                        ranking = np.argsort(scores)[::-1][:max(1, len(candidates) // factor)]
+                        candidates = [candidates[idx] for idx in ranking]
+                        n_samples = min(n_train, n_samples * factor)
+
+                best = int(np.argmax(scores))
+                results[name] = {'params': candidates[best], 'cv_score': scores[best]}
+                print(f"{name}: dokładność CV {scores[best]:.4f} dla {candidates[best]} "
+                      f"({time.perf_counter() - start:.2f} s)")
+
+        self.best_params = {name: result['params'] for name, result in results.items()}
+        self.save_best_params(results, search=search, cv=cv)
+        return results
+
+    def best_params_path(self):
+        return f'models/{self.current_dataset}/best_params.json'
+
+    def load_best_params(self):
+        """Wczytuje hiperparametry zapisane przez tune_models() (pusty słownik, jeśli ich brak)."""
+        path = self.best_params_path()
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return {name: result['params'] for name, result in json.load(f)['models'].items()}
+
+    def save_best_params(self, results, **search_info):
+        """Zapisuje zwycięską konfigurację obok artefaktów modeli."""
+        path = self.best_params_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'dataset': self.current_dataset, **search_info, 'models': results}, f, indent=2)
+        print(f"Zapisano najlepsze hiperparametry do {path}")
+
     def evaluate_models(self):
         """
         Przeprowadza szczegółową ewaluację wytrenowanych modeli,
@@ -183,18 +615,29 @@ class MultiDatasetPredictor:
 
         print(f"\nOcena modeli dla zbioru {self.current_dataset}:")
 
+        report = {}
         for model_name, model in self.models.items():
+            # Jedno predict_proba na zbiór - etykiety i wszystkie metryki wyprowadzane są z tego samego wyniku
+            train_accuracy = np.mean((model.predict_proba(self.X_train)[:, 1] > 0.5) == self.y_train)
+            test_probability = model.predict_proba(self.X_test)[:, 1]
+            report[model_name] = metrics = evaluate_probabilities(self.y_test, test_probability)
+
             print(f"\n=== {model_name.upper()} ===")
-            print(f"Dokładność na zbiorze treningowym: {model.score(self.X_train, self.y_train):.4f}")
-            print(f"Dokładność na zbiorze testowym: {model.score(self.X_test, self.y_test):.4f}")
-            y_pred = model.predict(self.X_test)
+            print(f"Dokładność na zbiorze treningowym: {train_accuracy:.4f}")
+            print(f"Dokładność na zbiorze testowym: {metrics['accuracy']:.4f}")
+            if metrics['roc_auc'] is not None:
+                print(f"ROC-AUC: {metrics['roc_auc']:.4f}, Brier: {metrics['brier']:.4f}")
+            print(f"Macierz pomyłek [[TN, FP], [FN, TP]]: {metrics['confusion_matrix']}")
             print("\nRaport klasyfikacji:")
-            print(classification_report(self.y_test, y_pred))
+            print(classification_report(self.y_test, (test_probability > 0.5).astype(int)))
+        return report
 
-    def save_models(self):
+    def save_models(self, training_state=None):
         """
-        Zapisuje wytrenowane modele i skaler do plików.
-        Tworzy osobny katalog dla każdego zbioru danych.
+        Zapisuje wytrenowane modele wraz ze skalerem jako jeden wersjonowany artefakt
+        models/<zbiór>/<wersja>/pipeline.joblib, a następnie przestawia wskaźnik models/<zbiór>/CURRENT
+        na nową wersję. Działająca aplikacja wykrywa zmianę wskaźnika i przeładowuje modele bez restartu.
+        training_state (znacznik postępu douczania) jest zapisywany w katalogu wersji jako TRAINING_STATE_FILE.
         """
         if not self.models:
             print("Najpierw wytreniuj modele!")
@@ -204,19 +647,69 @@ class MultiDatasetPredictor:
         model_dir = f'models/{self.current_dataset}'
         os.makedirs(model_dir, exist_ok=True)
 
-        # Zapisywanie modeli
-        for model_name, model in self.models.items():
-            model_path = f'{model_dir}/{model_name}_model.joblib'
-            joblib.dump(model, model_path)
-            print(f"Zapisano model {model_name} do {model_path}")
-
-        # Zapisywanie skalera
-        scaler_path = f'{model_dir}/scaler.joblib'
-        joblib.dump(self.scaler, scaler_path)
-        print(f"Zapisano skaler do {scaler_path}")
+        # Równoległość treningu nie jest przenoszona do aplikacji - serwer obsługuje żądania we własnych wątkach
+        self.models['rf'].set_params(n_jobs=None)
+        pipeline = ModelPipeline(self.current_dataset, feature_names(self.current_dataset), self.models, self.scaler,
+                                 precision=self.compiled_precision)
+
+        # Zapis bez kompresji - tablice NumPy pozostają w pliku w surowej postaci,
+        # dzięki czemu aplikacja może je mapować przez joblib.load(..., mmap_mode='r')
+        version_dir = f'{model_dir}/{pipeline.version}'
+        os.makedirs(version_dir, exist_ok=True)
+        pipeline_path = f'{version_dir}/pipeline.joblib'
+        self.atomic_dump(pipeline, pipeline_path)
+        print(f"Zapisano pipeline (skaler + {', '.join(self.models)}) w wersji {pipeline.version} do {pipeline_path}")
+        if training_state is not None:
+            self.atomic_write_text(json.dumps(training_state, indent=2), f'{version_dir}/{TRAINING_STATE_FILE}')
+
+        # Przestawienie wskaźnika aktualnej wersji dopiero po kompletnym zapisie artefaktu
+        self.atomic_write_text(pipeline.version, f'{model_dir}/CURRENT')
+        self.prune_versions(model_dir, keep=pipeline.version)
 
         print(f"\nWszystkie modele dla zbioru {self.current_dataset} zostały zapisane!")
 
+    @staticmethod
+    def atomic_dump(obj, path):
+        """
+        Zapisuje obiekt przez joblib do pliku tymczasowego w tym samym katalogu,
+        a następnie podmienia plik docelowy atomowo (os.replace). Działająca aplikacja
+        nigdy nie widzi częściowo zapisanego artefaktu.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.joblib')
+        os.close(fd)
+        try:
+            joblib.dump(obj, tmp_path, compress=0)
+            os.chmod(tmp_path, 0o644)  # mkstemp tworzy plik 0600 - aplikacja może działać jako inny użytkownik
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def atomic_write_text(text, path):
+        """Zapisuje krótki plik tekstowy (np. wskaźnik CURRENT) przez plik tymczasowy i os.replace."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def prune_versions(model_dir, keep):
+        """
+        Usuwa najstarsze katalogi wersji modeli, pozostawiając MODEL_KEEP_VERSIONS najnowszych
+        (w tym aktualną). Pliki zmapowane w pamięci przez działające procesy pozostają dla nich dostępne.
+        """
+        versions = sorted(name for name in os.listdir(model_dir)
+                          if name.isdigit() and os.path.isdir(os.path.join(model_dir, name)))
+        for version in versions[:-MODEL_KEEP_VERSIONS]:
+            if version != keep:
+                shutil.rmtree(os.path.join(model_dir, version))
+
     def get_features(self):
         """
         Zwraca listę cech dla aktualnego zbioru danych
@@ -226,11 +719,215 @@ class MultiDatasetPredictor:
         return self.DATASETS_CONFIG[self.current_dataset]['features']
 
 
+def cross_validate_model(dataset_name, model_name, cv=5):
+    """
+    K-krotna walidacja krzyżowa jednego modelu na zbiorze treningowym (foldy z get_folds).
+    Funkcja uruchamiana w osobnym procesie - predict_proba jest liczone raz na fold,
+    a wszystkie metryki wyprowadzane są z tego samego wyniku.
+    """
+    predictor = MultiDatasetPredictor()
+    predictor.load_dataset(dataset_name, verbose=False)
+    params = predictor.best_params.get(model_name)
+    fold_metrics = []
+    for X_train, y_train, X_val, y_val in predictor.get_folds(cv):
+        model = build_model(model_name, params, n_jobs=1).fit(X_train, y_train)
+        fold_metrics.append(evaluate_probabilities(y_val, model.predict_proba(X_val)[:, 1]))
+    return dataset_name, model_name, summarize_folds(fold_metrics)
+
+
+def evaluate_all(dataset_names, cv=5, processes=None):
+    """
+    Ocenia modele wybranych zbiorów danych i zapisuje raport JSON (EVALUATION_REPORT_FILE) obok aktualnej
+    wersji modeli w models/<zbiór>:
+    - cross_validation: walidacja krzyżowa każdej pary (zbiór, model) uruchamiana równolegle w puli procesów
+    - holdout: metryki zapisanych modeli na zbiorze testowym (jedno wywołanie pipeline'u dla wszystkich modeli)
+    """
+    from model_loader import read_pipeline, resolve_artifact
+
+    tasks = [(dataset_name, model_name) for dataset_name in dataset_names for model_name in MODEL_CLASSES]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes or min(len(tasks), os.cpu_count() or 1)) as pool:
+        cv_results = list(pool.map(cross_validate_model, *zip(*tasks), [cv] * len(tasks)))
+    print(f"\nWalidacja krzyżowa ({len(tasks)} par zbiór/model, {cv} foldów): {time.perf_counter() - start:.2f} s")
+
+    reports = {}
+    for dataset_name in dataset_names:
+        predictor = MultiDatasetPredictor()
+        predictor.load_dataset(dataset_name, verbose=False)
+        pipeline, _ = read_pipeline(dataset_name)
+        probabilities = pipeline.predict_proba(predictor.X_test_raw)
+        report = {
+            'dataset': dataset_name,
+            'model_version': pipeline.version,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'holdout': {model_name: evaluate_probabilities(predictor.y_test, probability)
+                        for model_name, probability in probabilities.items()},
+            'cross_validation': {model_name: summary for name, model_name, summary in cv_results
+                                 if name == dataset_name}
+        }
+
+        artifact_path = resolve_artifact(dataset_name)
+        report_dir = os.path.dirname(artifact_path) if artifact_path.endswith('.joblib') else artifact_path
+        predictor.atomic_write_text(json.dumps(report, indent=2), f'{report_dir}/{EVALUATION_REPORT_FILE}')
+        reports[dataset_name] = report
+
+        print(f"\n=== {dataset_name} (wersja {pipeline.version}) -> {report_dir}/{EVALUATION_REPORT_FILE} ===")
+        print(f"{'model':<6}{'acc test':>10}{'AUC test':>10}{'Brier':>8}{'acc CV':>16}{'AUC CV':>16}")
+        for model_name in MODEL_CLASSES:
+            holdout, summary = report['holdout'][model_name], report['cross_validation'][model_name]
+            auc = f"{holdout['roc_auc']:.4f}" if holdout['roc_auc'] is not None else '-'
+            cv_auc = f"{summary['roc_auc']['mean']:.4f}±{summary['roc_auc']['std']:.4f}" if summary['roc_auc'] else '-'
+            print(f"{model_name:<6}{holdout['accuracy']:>10.4f}{auc:>10}{holdout['brier']:>8.4f}"
+                  f"{summary['accuracy']['mean']:>9.4f}±{summary['accuracy']['std']:.4f}{cv_auc:>16}")
+    return reports
+
+
+def train_dataset(dataset_name, n_jobs=-1):
+    """
+    Wczytuje zbiór danych, trenuje i zapisuje wszystkie modele.
+    Funkcja uruchamiana w osobnym procesie - zwraca czasy poszczególnych etapów.
+    """
+    predictor = MultiDatasetPredictor()
+
+    start = time.perf_counter()
+    predictor.load_dataset(dataset_name)
+    predictor.timings['load'] = time.perf_counter() - start
+
+    predictor.train_models(n_jobs=n_jobs)
+
+    start = time.perf_counter()
+    predictor.save_models()
+    predictor.timings['save'] = time.perf_counter() - start
+
+    return dataset_name, predictor.timings
+
+
+def train_all(dataset_names, processes=None, n_jobs=None):
+    """
+    Trenuje wybrane zbiory danych równolegle w puli procesów i wypisuje podsumowanie czasów.
+    Domyślnie rdzenie są dzielone po równo między procesy, aby uniknąć nadmiernej liczby wątków.
+    """
+    processes = processes or len(dataset_names)
+    if n_jobs is None:
+        n_jobs = max(1, (os.cpu_count() or 1) // processes)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = dict(pool.map(train_dataset, dataset_names, [n_jobs] * len(dataset_names)))
+    total = time.perf_counter() - start
+
+    stages = ['load', 'rf', 'lr', 'dt', 'save']
+    print("\n=== PODSUMOWANIE CZASÓW [s] ===")
+    print(f"{'zbiór':<15}" + "".join(f"{stage:>9}" for stage in stages) + f"{'suma':>9}")
+    for dataset_name in dataset_names:
+        timings = results[dataset_name]
+        print(f"{dataset_name:<15}" + "".join(f"{timings[stage]:>9.3f}" for stage in stages)
+              + f"{sum(timings[stage] for stage in stages):>9.3f}")
+    print(f"Całkowity czas (równolegle): {total:.3f} s")
+    return results
+
+
+def run_cli(argv):
+    """
+    Nieinteraktywny interfejs wiersza poleceń, np. do nocnego trenowania:
+        python multi-dataset-predictor.py train --all
+        python multi-dataset-predictor.py train --dataset diabetes --n-jobs 4
+        python multi-dataset-predictor.py tune --all --search halving
+        python multi-dataset-predictor.py evaluate --all --cv 5
+        python multi-dataset-predictor.py compact --dataset diabetes --apply medium float32
+        python multi-dataset-predictor.py update --all
+    """
+    parser = argparse.ArgumentParser(description="Trenowanie modeli dla zbiorów danych medycznych")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help='wytrenuj i zapisz modele')
+    target = train_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--all', action='store_true', help='wszystkie zbiory danych')
+    target.add_argument('--dataset', action='append', choices=list(MultiDatasetPredictor.DATASETS_CONFIG),
+                        help='wybrany zbiór danych (można podać wielokrotnie)')
+    train_parser.add_argument('--processes', type=int, help='liczba równoległych procesów (domyślnie liczba zbiorów)')
+    train_parser.add_argument('--n-jobs', type=int, help='liczba wątków Random Forest w każdym procesie')
+
+    tune_parser = subparsers.add_parser('tune', help='dobierz hiperparametry walidacją krzyżową')
+    target = tune_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--all', action='store_true', help='wszystkie zbiory danych')
+    target.add_argument('--dataset', action='append', choices=list(MultiDatasetPredictor.DATASETS_CONFIG),
+                        help='wybrany zbiór danych (można podać wielokrotnie)')
+    tune_parser.add_argument('--search', choices=('random', 'halving'), default='random', help='metoda przeszukiwania')
+    tune_parser.add_argument('--n-iter', type=int, default=20, help='liczba kandydatów na model')
+    tune_parser.add_argument('--cv', type=int, default=5, help='liczba foldów walidacji krzyżowej')
+    tune_parser.add_argument('--n-jobs', type=int, default=-1, help='liczba równoległych procesów oceny')
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='oceń modele i zapisz raport JSON obok modeli')
+    target = evaluate_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--all', action='store_true', help='wszystkie zbiory danych')
+    target.add_argument('--dataset', action='append', choices=list(MultiDatasetPredictor.DATASETS_CONFIG),
+                        help='wybrany zbiór danych (można podać wielokrotnie)')
+    evaluate_parser.add_argument('--cv', type=int, default=5, help='liczba foldów walidacji krzyżowej')
+    evaluate_parser.add_argument('--processes', type=int, help='liczba równoległych procesów walidacji krzyżowej')
+
+    compact_parser = subparsers.add_parser('compact', help='porównaj przycięte i kwantyzowane warianty modeli')
+    target = compact_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--all', action='store_true', help='wszystkie zbiory danych')
+    target.add_argument('--dataset', action='append', choices=list(MultiDatasetPredictor.DATASETS_CONFIG),
+                        help='wybrany zbiór danych (można podać wielokrotnie)')
+    compact_parser.add_argument('--level', action='append', choices=list(COMPACTION_LEVELS),
+                                help='poziom kompaktowania (można podać wielokrotnie; domyślnie wszystkie)')
+    compact_parser.add_argument('--precision', action='append', choices=TREE_PRECISIONS,
+                                help='dokładność tablic drzew (można podać wielokrotnie; domyślnie wszystkie)')
+    compact_parser.add_argument('--apply', nargs=2, metavar=('POZIOM', 'DOKŁADNOŚĆ'),
+                                help='zapisz wybrany wariant jako nową wersję modeli')
+    compact_parser.add_argument('--n-jobs', type=int, default=-1, help='liczba wątków Random Forest')
+
+    update_parser = subparsers.add_parser('update', help='doucz modele predykcjami z wynikiem zapisanymi w bazie')
+    target = update_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--all', action='store_true', help='wszystkie zbiory danych')
+    target.add_argument('--dataset', action='append', choices=list(MultiDatasetPredictor.DATASETS_CONFIG),
+                        help='wybrany zbiór danych (można podać wielokrotnie)')
+    update_parser.add_argument('--add-trees', type=int, default=RF_UPDATE_TREES,
+                               help='liczba drzew dodawanych do Random Forest')
+    update_parser.add_argument('--lr-epochs', type=int, default=LR_UPDATE_EPOCHS,
+                               help='liczba epok SGD regresji logistycznej')
+    update_parser.add_argument('--refit-dt', action='store_true',
+                               help='dopasuj Decision Tree od nowa (CSV + wszystkie wiersze z wynikiem)')
+    update_parser.add_argument('--database-url', help='adres bazy predykcji (domyślnie DATABASE_URL aplikacji)')
+    update_parser.add_argument('--n-jobs', type=int, help='liczba wątków trenowania nowych drzew')
+
+    args = parser.parse_args(argv)
+    dataset_names = list(MultiDatasetPredictor.DATASETS_CONFIG) if args.all else args.dataset
+
+    if args.command == 'train':
+        train_all(dataset_names, processes=args.processes, n_jobs=args.n_jobs)
+    elif args.command == 'tune':
+        for dataset_name in dataset_names:
+            predictor = MultiDatasetPredictor()
+            predictor.load_dataset(dataset_name)
+            predictor.tune_models(search=args.search, n_iter=args.n_iter, cv=args.cv, n_jobs=args.n_jobs)
+    elif args.command == 'evaluate':
+        evaluate_all(dataset_names, cv=args.cv, processes=args.processes)
+    elif args.command == 'compact':
+        for dataset_name in dataset_names:
+            predictor = MultiDatasetPredictor()
+            predictor.load_dataset(dataset_name)
+            predictor.compact_models(levels=args.level, precisions=args.precision or TREE_PRECISIONS,
+                                     apply=args.apply, n_jobs=args.n_jobs)
+    elif args.command == 'update':
+        for dataset_name in dataset_names:
+            MultiDatasetPredictor().update_models(dataset_name, add_trees=args.add_trees, lr_epochs=args.lr_epochs,
+                                                  refit_dt=args.refit_dt, database_url=args.database_url,
+                                                  n_jobs=args.n_jobs)
+
+
 def main():
     """
     Główna funkcja programu oferująca interfejs konsolowy
     do interakcji z systemem trenowania modeli.
+    Z argumentami wiersza poleceń działa nieinteraktywnie (run_cli).
     """
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+        return
+
     predictor = MultiDatasetPredictor()
 
     while True:
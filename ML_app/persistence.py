@@ -0,0 +1,140 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from sqlalchemy import insert
+
+import metrics
+from models import db, Prediction
+
+logger = logging.getLogger(__name__)
+
+# Maksymalna liczba rekordów zapisywanych w jednej transakcji
+WRITE_BATCH_SIZE = 1000
+
+# Maksymalny czas oczekiwania na zapis pozostałych rekordów przy zamykaniu procesu (s)
+SHUTDOWN_TIMEOUT = 10.0
+
+# Znacznik końca pracy wątku zapisującego
+_STOP = object()
+
+# Utworzone obiekty zapisu, zatrzymywane przy zamykaniu procesu. Słabe referencje, aby rejestracja
+# nie utrzymywała przy życiu aplikacji tworzonych wielokrotnie w jednym procesie (benchmarki, testy)
+_writers = weakref.WeakSet()
+
+
+def _stop_writers():
+    for writer in list(_writers):
+        writer.stop()
+
+
+atexit.register(_stop_writers)
+
+
+class PredictionWriter:
+    """
+    Zapisuje rekordy tabeli prediction poza ścieżką obsługi żądania.
+    Żądanie jedynie wrzuca rekordy do kolejki w pamięci procesu, a wątek w tle
+    zbiera wszystko, co się nagromadziło, i zapisuje jednym insertem w jednej transakcji.
+    Dzięki temu odpowiedź nie czeka na blokadę zapisu SQLite ani na fsync.
+    Tryb 'sync' zapisuje rekordy od razu w wątku żądania (np. w testach).
+    """
+
+    def __init__(self, app, mode='async', batch_size=WRITE_BATCH_SIZE):
+        self.app = app
+        self.mode = mode
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        if self.mode not in ('async', 'sync'):
+            raise ValueError(f"Nieznany tryb zapisu predykcji: {self.mode}")
+        _writers.add(self)
+
+    def _ensure_started(self):
+        # Wątki nie przechodzą przez fork (np. gunicorn z preload_app), więc wątek
+        # zapisujący uruchamiany jest leniwie, osobno w każdym procesie
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def submit(self, records):
+        """
+        Przyjmuje listę rekordów (słowników kolumna -> wartość) do zapisu.
+        Znacznik czasu nadawany jest w chwili przyjęcia, a nie zapisu, aby zachować kolejność w historii.
+        """
+        now = datetime.utcnow()
+        for record in records:
+            record.setdefault('timestamp', now)
+
+        if self.mode == 'sync':
+            self._write(records)
+            return
+
+        self._ensure_started()
+        self._queue.put(records)
+
+    def _write(self, records):
+        start = time.perf_counter()
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(Prediction), records)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        metrics.observe_db_write(time.perf_counter() - start, len(records))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch, taken = ([] if stop else list(item)), 1
+
+            # Dobranie wszystkiego, co czeka już w kolejce (do limitu rekordów w transakcji)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.extend(item)
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    logger.exception("Nie udało się zapisać %d predykcji", len(batch))
+            for _ in range(taken):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Czeka, aż wszystkie rekordy przyjęte do tej pory zostaną zapisane."""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self, timeout=SHUTDOWN_TIMEOUT):
+        """Zapisuje pozostałe rekordy i zatrzymuje wątek zapisujący (wywoływane przy zamykaniu procesu)."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Nie zakończono zapisu predykcji w ciągu %.1f s", timeout)
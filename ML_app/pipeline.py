@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import sklearn
+
+import metrics
+from compiled_models import CompiledModels
+from inference import MODEL_NAMES
+
+# Wersja formatu artefaktu pipeline.joblib - zwiększana przy każdej niezgodnej zmianie
+PIPELINE_FORMAT_VERSION = 1
+
+# Maksymalna liczba wierszy liczona skompilowanym silnikiem NumPy. Przy pojedynczych wierszach
+# dominuje narzut walidacji scikit-learn, natomiast duże partie szybciej liczy kod Cython scikit-learn.
+COMPILED_MAX_ROWS = 128
+
+
+class ModelPipeline:
+    """
+    Jeden artefakt na zbiór danych, zawierający skalowanie i wszystkie trzy klasyfikatory
+    (rf, lr, dt), dzięki czemu nie da się połączyć modelu z niewłaściwym skalerem.
+    Przyjmuje surowe cechy w kolejności self.features i zwraca prawdopodobieństwa klasy pozytywnej.
+    Przy zmniejszonej dokładności (float32, uint8) artefakt zawiera tylko skompilowane tablice - modele
+    scikit-learn nie są zapisywane (estimators = None), a wszystkie wejścia liczy skompilowany silnik.
+    """
+
+    def __init__(self, dataset_name, features, estimators, scaler, version=None, precision='float64'):
+        self.format_version = PIPELINE_FORMAT_VERSION
+        self.dataset_name = dataset_name
+        self.features = list(features)
+        self.version = version or datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+        self.sklearn_version = sklearn.__version__
+        self.scaler = scaler
+        # Modele ze skalowaniem wliczonym w wagi (lr) i progi podziału (rf, dt),
+        # tablice drzew przechowywane z dokładnością precision (compiled_models.TREE_PRECISIONS)
+        self.compiled_precision = precision
+        self.compiled = CompiledModels.from_estimators(estimators, scaler, precision)
+        self.compiled_max_rows = COMPILED_MAX_ROWS
+        self.estimators = None
+        if precision == 'float64':
+            self.estimators = {model_key: estimators[model_key] for model_key in MODEL_NAMES}
+
+    def __setstate__(self, state):
+        if state.get('format_version') != PIPELINE_FORMAT_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja artefaktu pipeline: {state.get('format_version')}")
+        self.__dict__.update(state)
+
+    def predict_proba(self, input_data):
+        """
+        Zwraca {klucz_modelu: ndarray prawdopodobieństw} dla macierzy surowych cech.
+        Małe wejścia liczy skompilowany silnik NumPy, a duże partie - skaler i modele scikit-learn
+        (bez modeli scikit-learn w artefakcie również duże partie liczy skompilowany silnik).
+        """
+        input_data = np.asarray(input_data, dtype=np.float64)
+        probabilities = {}
+
+        if self.estimators is None or len(input_data) <= self.compiled_max_rows:
+            input_data = input_data.reshape(-1, self.compiled.n_features)
+            for model_key in MODEL_NAMES:
+                start = time.perf_counter()
+                probabilities[model_key] = self.compiled.predict_model(model_key, input_data)
+                metrics.observe_model(self.dataset_name, model_key, time.perf_counter() - start)
+            return probabilities
+
+        with metrics.stage('scale', self.dataset_name):
+            input_scaled = self.scaler.transform(input_data)
+        for model_key, estimator in self.estimators.items():
+            start = time.perf_counter()
+            probabilities[model_key] = estimator.predict_proba(input_scaled)[:, 1]
+            metrics.observe_model(self.dataset_name, model_key, time.perf_counter() - start)
+        return probabilities
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Domyślna maksymalna liczba zapamiętanych wyników i czas ich ważności (s)
+CACHE_MAX_ENTRIES = 10000
+CACHE_TTL = 3600
+
+
+class PredictionCache:
+    """
+    Pamięć podręczna LRU z czasem ważności dla wyników inferencji pojedynczych wierszy.
+    Klucz to (zbiór danych, wersja artefaktu modeli, zakodowany wektor cech), więc po
+    załadowaniu nowej wersji modeli stare wyniki nie mogą zostać zwrócone.
+    Zapamiętywane są prawdopodobieństwa (przed progami decyzyjnymi), dzięki czemu
+    zmiana progów nie wymaga czyszczenia pamięci podręcznej.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(pipeline, input_data):
+        # + 0.0 zamienia -0.0 na 0.0, aby ta sama wartość dawała te same bajty klucza
+        features = np.ascontiguousarray(input_data, dtype=np.float64) + 0.0
+        return pipeline.dataset_name, pipeline.version, features.tobytes()
+
+    def get(self, key):
+        """Zwraca zapamiętane prawdopodobieństwa lub None (brak wpisu lub wpis przeterminowany)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, probabilities):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, probabilities)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def predict_proba(self, pipeline, input_data):
+        """
+        Zwraca {klucz_modelu: ndarray prawdopodobieństw} dla jednego wiersza cech,
+        uruchamiając modele tylko przy braku wyniku w pamięci podręcznej.
+        """
+        if self.max_entries <= 0:
+            return pipeline.predict_proba(input_data)
+
+        key = self.make_key(pipeline, input_data)
+        probabilities = self.get(key)
+        if probabilities is None:
+            probabilities = pipeline.predict_proba(input_data)
+            for probability in probabilities.values():
+                probability.flags.writeable = False
+            self.put(key, probabilities)
+        return probabilities
+
+    def invalidate(self, dataset_name=None):
+        """Usuwa wpisy wybranego zbioru danych (lub wszystkie, gdy dataset_name jest None)."""
+        with self._lock:
+            if dataset_name is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == dataset_name]:
+                del self._entries[key]
+
+    def stats(self):
+        """Liczniki trafień i chybień oraz bieżący rozmiar pamięci podręcznej."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,172 @@
+import numpy as np
+
+# Wspólny rejestr zbiorów danych używany przez aplikację Flask i MultiDatasetPredictor.
+# Kolejność 'features' jest kolejnością kolumn, na których trenowane są modele.
+#   path            - ścieżka do pliku CSV
+#   target          - kolumna z etykietami (0/1)
+#   target_encoding - mapowanie tekstowych etykiet na 0/1 (jeśli występują)
+#   features        - lista krotek (nazwa_cechy, opis)
+#   dtypes          - typ wartości cechy ('int' lub 'float')
+#   encodings       - mapowanie wartości cech kategorycznych na liczby
+DATASETS = {
+    'heart_disease': {
+        'path': 'datasets/heart-disease.csv',
+        'target': 'target',
+        'features': [
+            ('age', 'Wiek pacjenta'),
+            ('sex', 'Płeć pacjenta (0 = kobieta, 1 = mężczyzna)'),
+            ('cp', 'Typ bólu w klatce piersiowej'),
+            ('trestbps', 'Ciśnienie tętnicze krwi w spoczynku'),
+            ('chol', 'Poziom cholesterolu'),
+            ('fbs', 'Cukier we krwi na czczo'),
+            ('restecg', 'Wyniki EKG spoczynkowego'),
+            ('thalach', 'Maksymalne tętno'),
+            ('exang', 'Dławica wysiłkowa'),
+            ('oldpeak', 'Obniżenie odcinka ST'),
+            ('slope', 'Nachylenie odcinka ST'),
+            ('ca', 'Liczba głównych naczyń wieńcowych'),
+            ('thal', 'Wynik testu Thallium')
+        ],
+        'dtypes': {
+            'age': 'int', 'sex': 'int', 'cp': 'int', 'trestbps': 'float', 'chol': 'float',
+            'fbs': 'int', 'restecg': 'int', 'thalach': 'float', 'exang': 'int',
+            'oldpeak': 'float', 'slope': 'int', 'ca': 'int', 'thal': 'int'
+        },
+        'encodings': {}
+    },
+    'diabetes': {
+        'path': 'datasets/diabetes.csv',
+        'target': 'Outcome',
+        'features': [
+            ('Pregnancies', 'Liczba ciąż'),
+            ('Glucose', 'Poziom glukozy'),
+            ('BloodPressure', 'Ciśnienie krwi'),
+            ('SkinThickness', 'Grubość fałdu skórnego'),
+            ('Insulin', 'Poziom insuliny'),
+            ('BMI', 'Wskaźnik masy ciała'),
+            ('DiabetesPedigreeFunction', 'Funkcja rodowodu cukrzycy'),
+            ('Age', 'Wiek')
+        ],
+        'dtypes': {
+            'Pregnancies': 'int', 'Glucose': 'float', 'BloodPressure': 'float', 'SkinThickness': 'float',
+            'Insulin': 'float', 'BMI': 'float', 'DiabetesPedigreeFunction': 'float', 'Age': 'int'
+        },
+        'encodings': {}
+    },
+    'lung_cancer': {
+        'path': 'datasets/survey-lung-cancer.csv',
+        'target': 'LUNG_CANCER',
+        'target_encoding': {'YES': 1, 'NO': 0},
+        'features': [
+            ('GENDER', 'Płeć (M/F)'),
+            ('AGE', 'Wiek'),
+            ('SMOKING', 'Palenie tytoniu (1-2)'),
+            ('YELLOW_FINGERS', 'Żółte palce (1-2)'),
+            ('ANXIETY', 'Niepokój (1-2)'),
+            ('PEER_PRESSURE', 'Presja rówieśników (1-2)'),
+            ('CHRONIC DISEASE', 'Choroba przewlekła (1-2)'),
+            ('FATIGUE', 'Zmęczenie (1-2)'),
+            ('ALLERGY', 'Alergia (1-2)'),
+            ('WHEEZING', 'Świszczący oddech (1-2)'),
+            ('ALCOHOL CONSUMING', 'Spożywanie alkoholu (1-2)'),
+            ('COUGHING', 'Kaszel (1-2)'),
+            ('SHORTNESS OF BREATH', 'Duszność (1-2)'),
+            ('SWALLOWING DIFFICULTY', 'Trudności w połykaniu (1-2)'),
+            ('CHEST PAIN', 'Ból w klatce piersiowej (1-2)')
+        ],
+        'dtypes': {
+            'GENDER': 'int', 'AGE': 'int', 'SMOKING': 'int', 'YELLOW_FINGERS': 'int', 'ANXIETY': 'int',
+            'PEER_PRESSURE': 'int', 'CHRONIC DISEASE': 'int', 'FATIGUE': 'int', 'ALLERGY': 'int',
+            'WHEEZING': 'int', 'ALCOHOL CONSUMING': 'int', 'COUGHING': 'int', 'SHORTNESS OF BREATH': 'int',
+            'SWALLOWING DIFFICULTY': 'int', 'CHEST PAIN': 'int'
+        },
+        'encodings': {
+            'GENDER': {'M': 1, 'F': 0}
+        }
+    }
+}
+
+
+def feature_names(dataset_name):
+    """Zwraca nazwy cech zbioru danych w kolejności oczekiwanej przez modele."""
+    return [feature_name for feature_name, _ in DATASETS[dataset_name]['features']]
+
+
+class RowEncoder:
+    """
+    Prekompilowany koder wierszy dla jednego zbioru danych. Konwertery cech są wybierane raz,
+    przy tworzeniu kodera, więc kodowanie wiersza to jedno przejście bez rozgałęzień na cechę.
+    """
+
+    def __init__(self, dataset_name):
+        config = DATASETS[dataset_name]
+        self.dataset_name = dataset_name
+        self.features = feature_names(dataset_name)
+        self.encodings = config['encodings']
+        self._converters = [
+            (name, self._categorical(name, self.encodings[name]) if name in self.encodings else float)
+            for name in self.features
+        ]
+
+    @staticmethod
+    def _categorical(name, mapping):
+        def convert(value):
+            try:
+                return mapping[str(value).strip().upper()]
+            except KeyError:
+                raise ValueError(f"Nieprawidłowa wartość cechy {name}: {value}") from None
+        return convert
+
+    def _check_finite(self, values):
+        # float() i to_numpy() przyjmują 'nan', 'inf' i puste komórki CSV, a skompilowany silnik
+        # (w przeciwieństwie do scikit-learn) nie sprawdza wejścia - takie wiersze są odrzucane tutaj
+        finite = np.isfinite(values).reshape(-1, len(self.features))
+        if not finite.all():
+            names = [name for name, ok in zip(self.features, finite.all(axis=0)) if not ok]
+            row = int(np.argmin(finite.all(axis=1))) + 1
+            raise ValueError(f"Brakujące lub nieskończone wartości cech {', '.join(names)} (wiersz {row})")
+        return values
+
+    def encode(self, row):
+        """
+        Koduje jeden wiersz (np. formularz lub słownik JSON) do wektora float64.
+        Zgłasza ValueError dla wartości brakujących lub nieskończonych (np. 'nan', 'inf').
+        """
+        return self._check_finite(np.fromiter((convert(row[name]) for name, convert in self._converters),
+                                              dtype=np.float64, count=len(self._converters)))
+
+    def encode_frame(self, frame):
+        """
+        Koduje DataFrame (np. wiersze z CSV lub żądania zbiorczego) do macierzy float64,
+        ustawiając kolumny w kolejności cech. Cechy kategoryczne mapowane są wektorowo.
+        Zgłasza ValueError dla wartości brakujących lub nieskończonych (np. pustych komórek CSV).
+        """
+        missing_columns = set(self.features) - set(frame.columns)
+        if missing_columns:
+            raise ValueError(f"Brakujące kolumny: {', '.join(sorted(missing_columns))}")
+
+        frame = frame[self.features].copy()
+        for name, mapping in self.encodings.items():
+            encoded = frame[name].astype(str).str.strip().str.upper().map(mapping)
+            if encoded.isna().any():
+                raise ValueError(f"Nieprawidłowe wartości cechy {name}")
+            frame[name] = encoded
+
+        return self._check_finite(frame.to_numpy(dtype=np.float64))
+
+
+# Kodery wierszy tworzone raz przy imporcie modułu
+ENCODERS = {dataset_name: RowEncoder(dataset_name) for dataset_name in DATASETS}
+
+
+def check_feature_order(dataset_name, recorded_features):
+    """
+    Sprawdza, czy lista cech zapisana w artefakcie modelu zgadza się ze schematem.
+    Niezgodność (np. inna kolejność kolumn) oznaczałaby ciche, błędne predykcje.
+    """
+    expected = feature_names(dataset_name)
+    recorded = [str(name) for name in recorded_features]
+    if recorded != expected:
+        raise ValueError(
+            f"Cechy modelu dla zbioru {dataset_name} nie zgadzają się ze schematem. "
+            f"Oczekiwano {expected}, w artefakcie zapisano {recorded}")
@@ -0,0 +1,33 @@
+import importlib
+import os
+import sys
+import warnings
+
+import pytest
+
+# Moduły aplikacji leżą płasko w ML_app, a ścieżki modeli i zbiorów danych są względne wobec tego katalogu
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+# Dołączone artefakty zapisano starszą wersją scikit-learn
+warnings.filterwarnings('ignore', module='sklearn')
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Tworzy aplikację na wskazanej (domyślnie pustej, tymczasowej) bazie SQLite, bez usług tła."""
+    flask_app = importlib.import_module('flask-app')
+
+    def make(database_path=None, **config):
+        database_path = database_path or tmp_path / 'test.db'
+        return flask_app.create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}',
+            'MODEL_PRELOAD': 'off',
+            'MODEL_WATCH_INTERVAL': 0,
+            'PREDICTION_WRITE_MODE': 'sync',
+            'METRICS_MODE': 'off',
+            **config
+        })
+
+    return make
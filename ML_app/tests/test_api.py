@@ -0,0 +1,31 @@
+import pytest
+
+from models import db, init_db, ApiToken, User
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app()
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    client.post('/register', data={'username': 'user', 'email': 'user@example.com', 'password': 'secret'})
+    client.post('/login', data={'username': 'user', 'password': 'secret'})
+    with app.app_context():
+        api_token, client.api_token = ApiToken.issue(User.query.filter_by(username='user').one())
+        db.session.add(api_token)
+        db.session.commit()
+    return client
+
+
+@pytest.mark.parametrize('body', ['{"rows": [', '{"rows": 5}', '{"rows": []}', '[1, 2]'])
+def test_batch_endpoints_reject_malformed_json(client, body):
+    headers = {'Content-Type': 'application/json'}
+    responses = [
+        client.post('/api/predict/diabetes/batch', data=body, headers=headers),
+        client.post('/api/v1/predict/diabetes', data=body,
+                    headers={**headers, 'Authorization': f'Bearer {client.api_token}'}),
+    ]
+    for response in responses:
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
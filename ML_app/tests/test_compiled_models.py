@@ -0,0 +1,89 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_models import TREE_PRECISIONS, CompiledModels, apply_trees, quantize_leaf_values, round_down_float32
+from model_loader import read_pipeline
+from pipeline import ModelPipeline
+from schema import DATASETS, ENCODERS
+
+# Dopuszczalna różnica prawdopodobieństw względem scikit-learn dla każdej dokładności tablic drzew
+TOLERANCE = {'float64': 1e-12, 'float32': 1e-6, 'uint8': 1 / 255}
+
+
+@pytest.fixture(scope='module', params=list(DATASETS))
+def dataset(request):
+    """Dołączone modele i wszystkie wiersze pliku CSV zbioru danych (surowe i przeskalowane cechy)."""
+    pipeline, _ = read_pipeline(request.param)
+    frame = pd.read_csv(DATASETS[request.param]['path'])
+    frame.columns = frame.columns.str.strip()
+    input_data = ENCODERS[request.param].encode_frame(frame)
+    return pipeline, input_data, pipeline.scaler.transform(input_data)
+
+
+@pytest.mark.parametrize('precision', TREE_PRECISIONS)
+def test_tree_decisions_match_sklearn(dataset, precision):
+    pipeline, input_data, input_scaled = dataset
+    compiled = CompiledModels.from_estimators(pipeline.estimators, pipeline.scaler, precision)
+
+    for model_key in ('rf', 'dt'):
+        estimators = pipeline.estimators['rf'].estimators_ if model_key == 'rf' else [pipeline.estimators['dt']]
+        offsets = np.cumsum([0] + [estimator.tree_.node_count for estimator in estimators[:-1]])
+        expected = np.column_stack([estimator.apply(input_scaled.astype(np.float32)) for estimator in estimators])
+        np.testing.assert_array_equal(apply_trees(compiled.arrays[model_key], input_data), expected + offsets)
+
+
+@pytest.mark.parametrize('precision', TREE_PRECISIONS)
+def test_probabilities_match_sklearn(dataset, precision):
+    pipeline, input_data, input_scaled = dataset
+    compiled = CompiledModels.from_estimators(pipeline.estimators, pipeline.scaler, precision)
+
+    for model_key, estimator in pipeline.estimators.items():
+        expected = estimator.predict_proba(input_scaled)[:, 1]
+        actual = compiled.predict_model(model_key, input_data)
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12 if model_key == 'lr' else TOLERANCE[precision])
+        if model_key != 'rf':
+            # Pojedyncze drzewo i regresja logistyczna - etykieta przy progu 0.5 musi być taka sama
+            np.testing.assert_array_equal(actual > 0.5, expected > 0.5)
+
+
+def test_pipeline_paths_agree(dataset):
+    """Małe partie (silnik skompilowany) i duże (scikit-learn) dają te same wyniki dla tych samych wierszy."""
+    pipeline, input_data, _ = dataset
+    batch = pipeline.predict_proba(np.repeat(input_data[:1], pipeline.compiled_max_rows + 1, axis=0))
+    row = pipeline.predict_proba(input_data[:1])
+    for model_key in pipeline.estimators:
+        np.testing.assert_allclose(row[model_key][0], batch[model_key][0], rtol=0, atol=1e-12)
+
+
+def test_round_down_float32():
+    values = np.array([56.99999992, 0.366, 57.0, -0.31975899636745453])
+    rounded = round_down_float32(values)
+    assert rounded.dtype == np.float32
+    assert np.all(rounded.astype(np.float64) <= values)
+    assert np.all(np.nextafter(rounded, np.float32(np.inf)).astype(np.float64) > values)
+
+
+def test_quantized_leaves_keep_side_of_half():
+    values = np.array([0.0, 0.25, 0.5, 0.5000001, 0.75, 1.0])
+    quantized = quantize_leaf_values(values) / 255
+    np.testing.assert_array_equal(quantized > 0.5, values > 0.5)
+    assert np.all(np.abs(quantized - values) < 1 / 255)
+
+
+
+@pytest.mark.parametrize('precision', ['float32', 'uint8'])
+def test_reduced_precision_pipeline_stores_only_compiled_arrays(dataset, precision):
+    pipeline, input_data, _ = dataset
+    reduced = ModelPipeline(pipeline.dataset_name, pipeline.features, pipeline.estimators, pipeline.scaler,
+                            precision=precision)
+    assert reduced.estimators is None
+    assert len(pickle.dumps(reduced)) < len(pickle.dumps(pipeline)) / 2
+
+    # Duże partie również liczy skompilowany silnik (nie ma modeli scikit-learn, do których mogłyby trafić)
+    batch = np.repeat(input_data, reduced.compiled_max_rows // len(input_data) + 2, axis=0)
+    expected = reduced.compiled.predict_proba(batch)
+    for model_key, probability in reduced.predict_proba(batch).items():
+        np.testing.assert_array_equal(probability, expected[model_key])
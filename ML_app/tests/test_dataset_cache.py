@@ -0,0 +1,42 @@
+import importlib
+import os
+
+import numpy as np
+import pytest
+
+trainer = importlib.import_module('multi-dataset-predictor')
+
+
+@pytest.fixture
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(trainer, 'DATASET_CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+def test_cache_keeps_other_writers_temporary_directories(cache_root):
+    dataset_dir = cache_root / 'diabetes'
+    # Zapis innego procesu w toku i bufor nieaktualnej wersji pliku CSV
+    (dataset_dir / '.tmp-other').mkdir(parents=True)
+    (dataset_dir / 'stale').mkdir()
+
+    predictor = trainer.MultiDatasetPredictor()
+    predictor.load_dataset('diabetes', verbose=False)
+
+    cache_dir = predictor.dataset_cache_dir('diabetes')
+    assert sorted(os.listdir(dataset_dir)) == ['.tmp-other', os.path.basename(cache_dir)]
+
+
+def test_cache_filled_by_another_process_is_reused(cache_root):
+    first = trainer.MultiDatasetPredictor()
+    first.load_dataset('diabetes', verbose=False)
+    cache_dir = first.dataset_cache_dir('diabetes')
+
+    # Drugi proces sparsował zbiór, zanim pierwszy zapisał bufor - zmiana nazwy nie może się udać
+    second = trainer.MultiDatasetPredictor()
+    second.X, second.y = second.parse_dataset('diabetes')
+    second.X_scaled, second.scaler = first.X_scaled, first.scaler
+    assert second.save_cached_dataset('diabetes', cache_dir) is False
+    assert os.listdir(os.path.dirname(cache_dir)) == [os.path.basename(cache_dir)]
+
+    second.load_dataset('diabetes', verbose=False)
+    np.testing.assert_array_equal(second.X_scaled, first.X_scaled)
@@ -0,0 +1,47 @@
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import sqlalchemy as sa
+
+from models import db, init_db, pack_features, pack_results, Prediction, User
+
+
+def add_predictions(user_id, count):
+    features = np.arange(count * 8, dtype=np.float64).reshape(count, 8)
+    results = {model_key: {'prediction': np.zeros(count, dtype=np.int64), 'probability': np.full(count, 0.25)}
+               for model_key in ('rf', 'lr', 'dt')}
+    start = datetime(2025, 1, 1)
+    # Co trzy wiersze ten sam znacznik czasu - kolejność rozstrzyga wtedy id
+    db.session.execute(sa.insert(Prediction), [
+        {'user_id': user_id, 'dataset': 'diabetes', 'timestamp': start + timedelta(seconds=i // 3),
+         'features': packed, 'probabilities': probabilities, 'labels': labels}
+        for i, (packed, (probabilities, labels)) in enumerate(zip(pack_features(features), pack_results(results)))
+    ])
+    db.session.commit()
+
+
+def test_history_cursor_pagination_visits_every_prediction_once(make_app):
+    app = make_app(HISTORY_PAGE_SIZE=7)
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    client.post('/register', data={'username': 'user', 'email': 'user@example.com', 'password': 'secret'})
+    client.post('/login', data={'username': 'user', 'password': 'secret'})
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='user').one().id
+        add_predictions(user_id, 30)
+        expected = [prediction.id for prediction in
+                    Prediction.query.order_by(Prediction.timestamp.desc(), Prediction.id.desc())]
+
+    seen, url = [], '/history/diabetes'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(int(value) for value in re.findall(r'/delete_prediction/diabetes/(\d+)', response.text))
+        next_cursor = re.search(r'before=([0-9]+-[0-9]+)', response.text)
+        url = f'/history/diabetes?before={next_cursor.group(1)}' if next_cursor else None
+
+    assert seen == expected
+    assert client.get('/history/diabetes?before=invalid').status_code == 400
@@ -0,0 +1,26 @@
+import threading
+import time
+
+import pytest
+
+from inference_pool import InferencePool, PoolSaturated
+
+
+def test_pool_counts_pending_tasks_and_rejects_overflow():
+    pool = InferencePool(max_workers=1, max_pending=2)
+    release = threading.Event()
+    callers = [threading.Thread(target=pool.run, args=(release.wait,)) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    while pool.pending() < 2:
+        time.sleep(0.001)
+
+    with pytest.raises(PoolSaturated):
+        pool.run(int)
+
+    release.set()
+    for caller in callers:
+        caller.join()
+    while pool.pending():
+        time.sleep(0.001)
+    assert pool.run(int, '7') == 7
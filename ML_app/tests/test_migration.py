@@ -0,0 +1,49 @@
+import shutil
+
+import pytest
+import sqlalchemy as sa
+
+from models import db, init_db, Prediction
+
+# Dołączona baza deweloperska w dawnym układzie (osobna tabela predykcji dla każdego zbioru danych)
+LEGACY_DATABASE = 'instance/predictions.db'
+LEGACY_TABLES = ('heart_disease_prediction', 'diabetes_prediction', 'lung_cancer_prediction')
+
+
+def dump_database(engine):
+    """Schemat i zawartość wszystkich tabel bazy SQLite."""
+    with engine.connect() as connection:
+        schema = connection.execute(sa.text('SELECT type, name, sql FROM sqlite_master ORDER BY name')).all()
+        tables = [name for kind, name, _ in schema if kind == 'table']
+        return schema, {name: connection.execute(sa.text(f'SELECT * FROM "{name}"')).all() for name in tables}
+
+
+def test_init_db_migrates_legacy_tables_once(make_app, tmp_path):
+    database_path = tmp_path / 'legacy.db'
+    shutil.copy(LEGACY_DATABASE, database_path)
+    app = make_app(database_path)
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            legacy_rows = {name: connection.execute(sa.text(f'SELECT * FROM {name}')).mappings().all()
+                           for name in LEGACY_TABLES}
+
+        migrated = init_db()
+
+        assert migrated == sum(len(rows) for rows in legacy_rows.values())
+        assert not set(LEGACY_TABLES) & set(sa.inspect(db.engine).get_table_names())
+        assert {'ix_prediction_user_dataset_timestamp', 'ix_prediction_dataset_outcome_at'} <= {
+            index['name'] for index in sa.inspect(db.engine).get_indexes('prediction')}
+        predictions = Prediction.query.order_by(Prediction.id).all()
+        assert len(predictions) == migrated
+        diabetes = [prediction for prediction in predictions if prediction.dataset == 'diabetes']
+        for prediction, row in zip(diabetes, legacy_rows['diabetes_prediction']):
+            assert prediction.user_id == row['user_id']
+            assert prediction.feature_values['Glucose'] == row['glucose']
+            # Prawdopodobieństwa pakowane są jako float32
+            assert prediction.results['rf']['probability'] == pytest.approx(row['rf_probability'], rel=1e-6)
+
+        # Ponowne wywołanie (np. przy każdym wdrożeniu) niczego nie zmienia
+        before = dump_database(db.engine)
+        assert init_db() == 0
+        assert dump_database(db.engine) == before
@@ -0,0 +1,26 @@
+import numpy as np
+
+from models import db, init_db, pack_features, pack_results, Prediction, User
+from persistence import PredictionWriter
+
+
+def test_async_writer_flushes_batched_records(make_app):
+    app = make_app()
+    with app.app_context():
+        init_db()
+        db.session.add(User(username='writer', email='writer@example.com', password_hash='x'))
+        db.session.commit()
+        user_id = User.query.filter_by(username='writer').one().id
+
+    writer = PredictionWriter(app, 'async', batch_size=10)
+    features = np.ones((25, 8))
+    results = {model_key: {'prediction': np.ones(25, dtype=np.int64), 'probability': np.full(25, 0.75)}
+               for model_key in ('rf', 'lr', 'dt')}
+    for packed, (probabilities, labels) in zip(pack_features(features), pack_results(results)):
+        writer.submit([{'user_id': user_id, 'dataset': 'diabetes', 'features': packed,
+                        'probabilities': probabilities, 'labels': labels}])
+    writer.flush()
+    writer.stop()
+
+    with app.app_context():
+        assert Prediction.query.filter_by(user_id=user_id).count() == 25
@@ -0,0 +1,11 @@
+import pytest
+
+from schema import ENCODERS
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', ''])
+def test_encoder_rejects_non_finite_values(value):
+    row = {name: '1' for name in ENCODERS['diabetes'].features}
+    row['Glucose'] = value
+    with pytest.raises(ValueError):
+        ENCODERS['diabetes'].encode(row)